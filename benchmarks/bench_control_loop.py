@@ -0,0 +1,240 @@
+"""
+Benchmarks for the control loop and command path, run against a
+SimulatedArmDevice and SDL's dummy video driver so no arm, gamepad or screen
+is needed.
+
+Run from the repository root:
+python benchmarks/bench_control_loop.py --output bench.json
+
+Results are printed (or written) as JSON so runs can be compared against each
+other to catch regressions before deploying.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from pygame.locals import JOYAXISMOTION, JOYBUTTONDOWN, JOYBUTTONUP
+
+from util.arm_client import ArmClient
+from util.arm_devices import SimulatedArmDevice
+from util.arm_server import ArmServer
+from util.input_manager import InputManager
+from util.instrumentation import StageTimer
+from util.robot_arm import RobotArm
+from robot_arm_control import RobotArmControl
+
+
+def rate(iterations, seconds):
+    return {'iterations': iterations, 'seconds': seconds, 'per_second': iterations / seconds}
+
+
+def timings(stage_timer):
+    summary = stage_timer.summary()
+    return dict((key, value * 1000.0 if key != 'count' else value) for key, value in summary.items())
+
+
+def bench_build_command(iterations):
+    arm = RobotArm(device=SimulatedArmDevice(record=False))
+    arm.move_elbow(1)
+    arm.move_base(2)
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        arm.build_command()
+    result = rate(iterations, time.perf_counter() - start_time)
+    arm.close()
+    return result
+
+
+def bench_update(iterations):
+    "Unbatched updates that change the command every time, so every one is a transfer"
+    device = SimulatedArmDevice(record=False)
+    arm = RobotArm(device=device)
+    # the reset when the arm was created is a transfer too, but not one being timed
+    transfers_before = device.transfer_count
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        arm.move_elbow(1 + (i & 1))
+    result = rate(device.transfer_count - transfers_before, time.perf_counter() - start_time)
+    arm.close()
+    return result
+
+
+def bench_render(frames):
+    screen = pygame.display.set_mode((640, 480))
+    arm = RobotArm(device=SimulatedArmDevice(record=False))
+    full_frames = StageTimer(frames)
+    changed_frames = StageTimer(frames)
+    unchanged_frames = StageTimer(frames)
+    for i in range(frames):
+        start_time = time.perf_counter()
+        arm.render_ui(screen, True)
+        full_frames.add(time.perf_counter() - start_time)
+
+        arm.move_base(i % 3)
+        arm.move_grip((i + 1) % 3)
+        start_time = time.perf_counter()
+        arm.render_ui(screen)
+        changed_frames.add(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        arm.render_ui(screen)
+        unchanged_frames.add(time.perf_counter() - start_time)
+    arm.close()
+    return {'full_redraw_ms': timings(full_frames),
+            'two_labels_changed_ms': timings(changed_frames),
+            'nothing_changed_ms': timings(unchanged_frames)}
+
+
+def synthetic_events(batch_size, step):
+    events = []
+    for i in range(batch_size):
+        if i % 4 == 3:
+            event_type = JOYBUTTONDOWN if step & 1 else JOYBUTTONUP
+            events.append(pygame.event.Event(event_type, joy=0, instance_id=0, button=i % 8))
+        else:
+            events.append(pygame.event.Event(JOYAXISMOTION, joy=0, instance_id=0, axis=i % 6,
+                                             value=((i + step) % 21 - 10) / 10.0))
+    return events
+
+
+def bench_input(batches, batch_size):
+    input_manager = InputManager()
+    event_batches = [synthetic_events(batch_size, step) for step in range(16)]
+    batch_times = StageTimer(batches)
+    for i in range(batches):
+        events = event_batches[i % len(event_batches)]
+        start_time = time.perf_counter()
+        input_manager.update_controller_input_events(events)
+        batch_times.add(time.perf_counter() - start_time)
+    result = timings(batch_times)
+    result['batch_size'] = batch_size
+    return result
+
+
+def bench_input_to_usb(samples):
+    """
+    Post a stick event, then time how long it takes to come out of the
+    simulated arm after going through pygame's queue, InputManager, the
+    control code and the writer thread.
+    """
+    device = SimulatedArmDevice(record=True)
+    control = RobotArmControl(device=device)
+    # pretend a pad is plugged in so handle_controller_input acts on the events
+    control.controller_input_manager.joystick = 'benchmark'
+    # whichever axis number drives the base on this platform
+    axis_map = control.controller_input_manager.axis_map
+    right_stick_x = [axis for axis, control_name in axis_map.items() if control_name == ('right_stick', 'x')][0]
+
+    latencies = StageTimer(samples)
+    for i in range(samples):
+        received = len(device.received_commands)
+        start_time = time.perf_counter()
+        pygame.event.post(pygame.event.Event(JOYAXISMOTION, joy=0, instance_id=0, axis=right_stick_x,
+                                             value=float(i & 1)))
+        control.handle_controller_input(pygame.event.get())
+        control.arm.flush()
+        while len(device.received_commands) == received:
+            time.sleep(0)
+        latencies.add(device.received_commands[-1][0] - start_time)
+    control.arm.close()
+    return timings(latencies)
+
+
+def bench_network(requests, samples):
+    """
+    Requests per second through an ArmServer on localhost, and the time from
+    a client sending a move to the simulated arm receiving the command.
+    """
+    device = SimulatedArmDevice(record=True)
+    arm = RobotArm(threaded_transport=True, device=device)
+    server = ArmServer(arm, port=0)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+
+    server_thread = threading.Thread(target=serve, name='ArmServerBenchmark')
+    server_thread.daemon = True
+    server_thread.start()
+    started.wait()
+
+    client = ArmClient(port=server.port)
+    transfers_before = device.transfer_count
+    start_time = time.perf_counter()
+    for i in range(requests):
+        client.move_base(1 + (i & 1))
+    client.snapshot()
+    result = rate(requests, time.perf_counter() - start_time)
+    result['transfers'] = device.transfer_count - transfers_before
+
+    latencies = StageTimer(samples)
+    for i in range(samples):
+        received = len(device.received_commands)
+        start_time = time.perf_counter()
+        client.move_grip(1 + (i & 1))
+        while len(device.received_commands) == received:
+            time.sleep(0)
+        latencies.add(device.received_commands[-1][0] - start_time)
+    result['request_to_usb_ms'] = timings(latencies)
+
+    client.close()
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    server_thread.join()
+    arm.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write the JSON results here instead of to stdout')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every iteration count by this')
+    args = parser.parse_args()
+
+    def scaled(count):
+        return max(1, int(count * args.scale))
+
+    # RobotArm chats on stdout, which is where the JSON goes
+    report_output = sys.stdout
+    sys.stdout = sys.stderr
+
+    pygame.init()
+    pygame.display.set_mode((640, 480))
+    results = {
+        'environment': {'python': platform.python_version(), 'pygame': pygame.version.ver,
+                        'machine': platform.machine(), 'system': platform.system()},
+        'build_command': bench_build_command(scaled(200000)),
+        'update_transfers': bench_update(scaled(50000)),
+        'render_ui': bench_render(scaled(500)),
+        'input_events_ms': bench_input(scaled(20000), 32),
+        'input_to_usb_ms': bench_input_to_usb(scaled(2000)),
+        'network': bench_network(scaled(50000), scaled(2000)),
+    }
+    pygame.quit()
+
+    report = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report + '\n')
+    else:
+        report_output.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,27 +3,63 @@ from pygame.locals import *
 
 from util.input_manager import InputManager
 from util.robot_arm import RobotArm
+from util.instrumentation import Instrumentation
+from util.motor_pwm import MotorPwm, duty_from_axis
 import time
 
+# The controller inputs that drive each joint, for pinning joints to controllers
+JOINT_CONTROLS = {'base': ('right_stick.x',), 'shoulder': ('right_stick.y',), 'elbow': ('left_stick.x',),
+                  'wrist': ('left_stick.y',), 'grip': ('right_trigger.value', 'left_trigger.value'),
+                  'light': ('button_right_bumper',)}
+
 
 # ------------------------------------------
-# Challenge 1 starts on line 31!
+# Challenge 1 starts on line 67!
 # ------------------------------------------
 class RobotArmControl:
 
-    def __init__(self):
+    def __init__(self, control_rate=60, render_rate=30, idle_wait=True, instrument=False, device=None,
+                 pwm_frequency=None, joint_controllers=None, input_backend='pygame'):
         pygame.init()
         pygame.display.set_caption('Robot Arm Control')
         self.screen = pygame.display.set_mode((640, 480))
         
-        self.controller_input_manager = InputManager()
-        self.arm = RobotArm()
+        # joint_controllers pins joints to controller slots, e.g. {'base': 0, 'elbow': 1}; the rest are shared
+        assignments = {}
+        for joint, slot in (joint_controllers or {}).items():
+            for control in JOINT_CONTROLS[joint]:
+                assignments[control] = slot
+        self.controller_input_manager = InputManager(assignments=assignments, backend=input_backend)
+        self.arm = RobotArm(batch_commands=True, threaded_transport=True, device=device)
 
         self.background = pygame.Surface(self.screen.get_size())
         self.background = self.background.convert(self.screen)
         self.background.fill((255, 255, 255))
 
-        self.previous_loop_time = time.clock()
+        # control ticks and redraws per second, and whether to sleep in
+        # pygame.event.wait while nothing is moving
+        self.control_rate = control_rate
+        self.render_rate = render_rate
+        self.idle_wait = idle_wait
+        self.clock = pygame.time.Clock()
+        self.next_render_time = 0.0
+        self.render_pending = False
+        self.full_redraw = True
+
+        # stage timings, shown over the UI with F3 when instrument is set
+        self.instrumentation = None
+        self.show_overlay = False
+        if instrument:
+            self.instrumentation = Instrumentation()
+            self.arm.set_instrumentation(self.instrumentation)
+        self.previous_poll_time = time.perf_counter()
+
+        # with a PWM frequency the sticks set each joint's speed instead of just its direction
+        self.motor_pwm = None
+        if pwm_frequency:
+            self.motor_pwm = MotorPwm(self.arm, pwm_frequency).start()
+
+        self.previous_loop_time = time.perf_counter()
         self.light_on = False
         self.first_light_press = True
 
@@ -72,39 +108,119 @@ class RobotArmControl:
     def update(self):
         running = True
         while running:
+            waited = self.idle_wait and self.is_idle()
+            if waited:
+                events = self.wait_for_events()
+            else:
+                self.clock.tick(self.control_rate)
+                events = pygame.event.get()
+            # when the events were read, which is when their inputs count as arriving
+            poll_time = time.perf_counter()
+
+            if self.instrumentation is not None:
+                loop_start_time = poll_time
+                if not waited:
+                    # a gap spent asleep in wait_for_events is idle time, not input sitting unread
+                    self.instrumentation.record('poll', poll_time - self.previous_poll_time)
+                self.previous_poll_time = poll_time
+
             self.handle_time()
-  
-            events = pygame.event.get()
-            self.handle_controller_input(events)
+            self.handle_controller_input(events, poll_time)
             for event in events:
                 if event.type == QUIT:
                     running = False
+
+                if event.type == VIDEOEXPOSE:
+                    self.full_redraw = True
                     
                 if event.type == KEYDOWN:
                     if event.key == K_LEFT:
                         print("left key down")
+                    if event.key == K_F3 and self.instrumentation is not None:
+                        self.show_overlay = not self.show_overlay
+                        self.full_redraw = True
                        
                 if event.type == KEYUP:
                     if event.key == K_LEFT:
                         print("left key up") 
-                        
-            self.screen.blit(self.background, (0, 0))
-            self.arm.render_ui(self.screen)
-            pygame.display.flip()
-            
+
+            if self.instrumentation is not None:
+                self.instrumentation.record('input', time.perf_counter() - loop_start_time)
+
+            # send everything changed this frame to the arm in one transfer
+            self.arm.flush()
+
+            if self.previous_loop_time >= self.next_render_time:
+                self.render()
+            else:
+                self.render_pending = True
+
+            if self.instrumentation is not None:
+                self.instrumentation.record('loop', time.perf_counter() - loop_start_time)
+
+        if self.motor_pwm is not None:
+            self.motor_pwm.stop()
+        self.controller_input_manager.close()
+        self.arm.close()
         pygame.quit()
 
+    def render(self):
+        if self.instrumentation is not None:
+            render_start_time = time.perf_counter()
+
+        # only the motor labels that changed get redrawn, unless the whole window needs it
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+        dirty_rects = self.arm.render_ui(self.screen, self.full_redraw)
+        if self.show_overlay:
+            # the arm image without its labels, which the overlay keeps clear of
+            dirty_rects.append(self.instrumentation.render_overlay(self.screen, self.arm.renderer.ui_background))
+        self.full_redraw = False
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        self.next_render_time = self.previous_loop_time + 1.0 / self.render_rate
+        self.render_pending = False
+
+        if self.instrumentation is not None:
+            self.instrumentation.record('render', time.perf_counter() - render_start_time)
+
+    def is_idle(self):
+        command = self.arm.build_command()
+        motors_running = command[0] != 0 or command[1] != 0
+        return not (motors_running or self.controller_input_manager.is_active(0.2) or
+                    self.arm.next_motion_deadline() is not None)
+
+    def wait_for_events(self):
+        # show the latest state before we go to sleep on the event queue
+        if self.render_pending:
+            self.render()
+
+        if self.controller_input_manager.needs_polling():
+            # the XInput pad only produces events when polled, so we can't block for long
+            timeout = int(1000 / self.control_rate)
+        else:
+            timeout = 0  # wait for as long as it takes
+
+        event = pygame.event.wait(timeout)
+        events = pygame.event.get()
+        if event.type != NOEVENT:
+            events.insert(0, event)
+        return events
+
     def handle_time(self):
-        new_loop_time = time.clock()
-        elapsed_time = new_loop_time - self.previous_loop_time
+        new_loop_time = time.perf_counter()
         self.previous_loop_time = new_loop_time
-        self.arm.update_time(new_loop_time, elapsed_time)
+        # the arm works out the time elapsed itself, as the PWM thread moves its clock on too
+        self.arm.update_time(new_loop_time)
 
-    def handle_controller_input(self, events):
+    def handle_controller_input(self, events, poll_time=None):
 
-        self.controller_input_manager.update_controller_input_events(events)
+        self.controller_input_manager.update_controller_input_events(events, poll_time)
 
-        if self.controller_input_manager.joystick is not None:
+        if self.controller_input_manager.joystick is not None and self.motor_pwm is not None:
+            self.handle_controller_duties()
+
+        elif self.controller_input_manager.joystick is not None:
             
             # Base
             if self.controller_input_manager.right_stick.x > 0.2:
@@ -146,8 +262,8 @@ class RobotArmControl:
             else:
                 self.arm.move_grip(0)
 
-            right_bumper_key = self.controller_input_manager.button_right_bumper.key
-            right_bumper_pressed = self.controller_input_manager.controller_buttons[right_bumper_key].value != 0
+        if self.controller_input_manager.joystick is not None:
+            right_bumper_pressed = self.controller_input_manager.button_right_bumper.value != 0
 
             if right_bumper_pressed:
                 if self.first_light_press:
@@ -161,9 +277,27 @@ class RobotArmControl:
             else:
                 self.first_light_press = True
 
+        if self.instrumentation is not None:
+            input_time = self.controller_input_manager.take_input_time()
+            if input_time is not None:
+                self.arm.trace_input(input_time)
+
+    # Same sticks and directions as above, but how far each one is pushed sets the joint's speed
+    def handle_controller_duties(self):
+        manager = self.controller_input_manager
+        self.motor_pwm.set_duty('base', duty_from_axis(manager.right_stick.x))
+        self.motor_pwm.set_duty('shoulder', duty_from_axis(manager.right_stick.y))
+        self.motor_pwm.set_duty('elbow', -duty_from_axis(manager.left_stick.x))
+        self.motor_pwm.set_duty('wrist', duty_from_axis(manager.left_stick.y))
+        if manager.right_trigger.value > 0.2:
+            self.motor_pwm.set_duty('grip', duty_from_axis(manager.right_trigger.value))
+        else:
+            self.motor_pwm.set_duty('grip', -duty_from_axis(max(manager.left_trigger.value, 0.0)))
+
 
-robot_arm_control = RobotArmControl()
-robot_arm_control.update()
+if __name__ == '__main__':
+    robot_arm_control = RobotArmControl()
+    robot_arm_control.update()
 
 # -----------------------------------------------
 # Pygame key codes
@@ -0,0 +1,40 @@
+import math
+
+from util.arm_protocol import (REQUEST, MOTOR_NAMES, OP_MOVE, OP_LIGHT, OP_MOVE_TO, OP_SNAPSHOT, STATUS_OK,
+                               STATUS_BAD_ARGUMENT, encode_request, decode_requests, encode_reply, decode_reply)
+
+
+def test_request_round_trip():
+    data = encode_request(OP_MOVE, 2, 1, 7, 1.5) + encode_request(OP_MOVE_TO, 4, 0, 8, -12.25)
+    assert decode_requests(data) == [(OP_MOVE, 2, 1, 7, 1.5), (OP_MOVE_TO, 4, 0, 8, -12.25)]
+
+
+def test_partial_frames_are_left_for_later():
+    data = encode_request(OP_LIGHT, 0, 1, 1) + encode_request(OP_LIGHT, 0, 0, 2)[:3]
+    assert decode_requests(data) == [(OP_LIGHT, 0, 1, 1, 0.0)]
+    assert len(data) % REQUEST.size == 3
+
+
+def test_request_ids_wrap_at_16_bits():
+    assert decode_requests(encode_request(OP_SNAPSHOT, request_id=0x10005))[0][3] == 5
+
+
+def test_reply_round_trip():
+    positions = [10.0, -5.5, 0.0, 30.25, -1.0]
+    opcode, status, request_id, command, decoded = decode_reply(
+        encode_reply(OP_SNAPSHOT, STATUS_OK, 42, [0x90, 2, 1], positions))
+    assert (opcode, status, request_id) == (OP_SNAPSHOT, STATUS_OK, 42)
+    assert bytearray(command) == bytearray([0x90, 2, 1])
+    assert decoded == dict(zip(MOTOR_NAMES, positions))
+
+
+def test_error_reply_has_empty_command_and_positions():
+    opcode, status, request_id, command, positions = decode_reply(encode_reply(OP_MOVE, STATUS_BAD_ARGUMENT, 3))
+    assert status == STATUS_BAD_ARGUMENT and bytearray(command) == bytearray(3)
+    assert all(position == 0.0 for position in positions.values())
+
+
+def test_non_finite_arguments_survive_encoding():
+    # the server, not the protocol, is what turns these down
+    argument = decode_requests(encode_request(OP_MOVE, 0, 1, 0, float('nan')))[0][4]
+    assert math.isnan(argument)
@@ -0,0 +1,39 @@
+import asyncio
+
+from util.arm_devices import SimulatedArmDevice
+from util.arm_protocol import REPLY, OP_MOVE, OP_MOVE_TO, OP_SNAPSHOT, STATUS_BAD_ARGUMENT, encode_request, decode_reply
+from util.arm_server import ArmServer
+from util.robot_arm import RobotArm
+
+
+def handle(requests):
+    "Replies the server gives to 'requests', handled on an event loop but without any sockets"
+    arm = RobotArm(device=SimulatedArmDevice())
+    server = ArmServer(arm)
+
+    async def run():
+        server.loop = asyncio.get_running_loop()
+        replies = server.handle_requests(b''.join(requests))
+        server.close()
+        return replies
+
+    replies = asyncio.run(run())
+    arm.close()
+    return [decode_reply(replies[i:i + REPLY.size]) for i in range(0, len(replies), REPLY.size)]
+
+
+def test_non_finite_arguments_are_turned_down():
+    replies = handle([encode_request(OP_MOVE, 2, 1, 1, float('nan')),
+                      encode_request(OP_MOVE, 0, 1, 2, float('inf')),
+                      encode_request(OP_MOVE_TO, 3, 0, 3, float('nan')),
+                      encode_request(OP_SNAPSHOT, request_id=4)])
+    assert [(reply[0], reply[1], reply[2]) for reply in replies[:3]] == [
+        (OP_MOVE, STATUS_BAD_ARGUMENT, 1), (OP_MOVE, STATUS_BAD_ARGUMENT, 2), (OP_MOVE_TO, STATUS_BAD_ARGUMENT, 3)]
+    # nothing was started
+    assert bytearray(replies[3][3]) == bytearray(3)
+
+
+def test_snapshot_includes_moves_not_sent_yet():
+    replies = handle([encode_request(OP_MOVE, 2, 1, 1, 0.5), encode_request(OP_SNAPSHOT, request_id=2)])
+    assert len(replies) == 1 and replies[0][2] == 2
+    assert bytearray(replies[0][3]) == bytearray([0x10, 0, 0])
@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+
+evdev = pytest.importorskip('evdev')
+from evdev import ecodes
+
+from util.evdev_input import EvdevReader
+
+
+class FakeDevice(object):
+    "An evdev InputDevice with made-up capabilities, reading from a pipe the test writes events to"
+
+    opened = []
+
+    def __init__(self, path):
+        FakeDevice.opened.append(path)
+        self.path = path
+        self.name = 'Test pad' if path.endswith('pad') else 'Test keyboard'
+        self.fd, self.write_fd = os.pipe()
+        self.events = []
+
+    def capabilities(self, absinfo=True):
+        if self.name == 'Test keyboard':
+            return {ecodes.EV_KEY: [ecodes.KEY_A, ecodes.KEY_B]}
+        return {ecodes.EV_KEY: [ecodes.BTN_SOUTH, ecodes.BTN_TR],
+                ecodes.EV_ABS: [(ecodes.ABS_RX, evdev.AbsInfo(0, -32768, 32767, 0, 0, 0)),
+                                (ecodes.ABS_Z, evdev.AbsInfo(0, 0, 255, 0, 0, 0))]}
+
+    def read(self):
+        events, self.events = self.events, []
+        return iter(events)
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self.write_fd)
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    paths = ['/dev/input/event0-kbd', '/dev/input/event1-pad']
+    FakeDevice.opened = []
+    monkeypatch.setattr(evdev, 'list_devices', lambda: list(paths))
+    monkeypatch.setattr(evdev, 'InputDevice', FakeDevice)
+    reader = EvdevReader()
+    reader.paths = paths
+    yield reader
+    # the reader's thread never ran, so close what the scans opened here
+    for path in list(reader.devices):
+        reader.remove(path)
+    reader.stop()
+
+
+def test_only_gamepads_are_kept_and_others_are_not_reopened(reader):
+    for i in range(5):
+        reader.scan()
+    assert list(reader.devices) == ['/dev/input/event1-pad']
+    assert FakeDevice.opened.count('/dev/input/event0-kbd') == 1
+    assert [record[:3] for record in reader.records] == [('added', '/dev/input/event1-pad', 'Test pad')]
+
+    # once the keyboard's node goes away it's forgotten, in case a gamepad gets the number next
+    reader.paths.remove('/dev/input/event0-kbd')
+    reader.scan()
+    assert not reader.rejected_paths
+
+
+def test_axes_and_buttons_are_scaled_and_timestamped(reader):
+    reader.scan()
+    reader.records.clear()
+    device, axes = reader.devices['/dev/input/event1-pad']
+    now = time.time()
+    seconds, microseconds = int(now), int((now % 1.0) * 1000000)
+    device.events = [evdev.InputEvent(seconds, microseconds, ecodes.EV_ABS, ecodes.ABS_RX, 32767),
+                     evdev.InputEvent(seconds, microseconds, ecodes.EV_ABS, ecodes.ABS_Z, 0),
+                     evdev.InputEvent(seconds, microseconds, ecodes.EV_KEY, ecodes.BTN_SOUTH, 2),
+                     evdev.InputEvent(seconds, microseconds, ecodes.EV_KEY, ecodes.KEY_A, 1)]
+    reader.read('/dev/input/event1-pad')
+
+    records = list(reader.records)
+    assert [record[2:5] for record in records] == [('right_stick', 'x', 1.0), ('left_trigger', 'value', 0.0),
+                                                  ('button_a', 'value', 1)]
+    # kernel wall clock times are moved onto perf_counter's clock
+    assert all(abs(record[5] - time.perf_counter()) < 1.0 for record in records)
@@ -0,0 +1,105 @@
+import pygame
+import pytest
+from pygame.locals import JOYAXISMOTION, JOYBUTTONDOWN, JOYBUTTONUP, JOYDEVICEREMOVED
+
+from util.input_manager import DEFAULT_BUTTON_MAP, InputManager
+
+AXIS_MAP = {0: ('right_stick', 'x'), 1: ('left_stick', 'x'), 2: ('right_trigger', 'value')}
+
+
+@pytest.fixture
+def make_manager():
+    pygame.init()
+    managers = []
+
+    def make(assignments=None):
+        manager = InputManager(axis_map=AXIS_MAP, button_map=DEFAULT_BUTTON_MAP, assignments=assignments)
+        # controllers that only turn up through events, so the tests don't depend on what's plugged in
+        manager.joysticks.clear()
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.close()
+    pygame.quit()
+
+
+def axis(instance_id, number, value):
+    return pygame.event.Event(JOYAXISMOTION, joy=instance_id, instance_id=instance_id, axis=number, value=value)
+
+
+def button(instance_id, number, pressed):
+    return pygame.event.Event(JOYBUTTONDOWN if pressed else JOYBUTTONUP, joy=instance_id, instance_id=instance_id,
+                              button=number)
+
+
+def test_first_controller_to_push_a_stick_keeps_it_until_it_lets_go(make_manager):
+    manager = make_manager()
+    manager.update_controller_input_events([axis(10, 0, 0.0), axis(11, 0, 0.0)])
+    manager.update_controller_input_events([axis(11, 0, 0.6)])
+    manager.update_controller_input_events([axis(10, 0, -0.9)])
+    assert manager.right_stick.x == 0.6
+    manager.update_controller_input_events([axis(11, 0, 0.0)])
+    assert manager.right_stick.x == -0.9
+
+
+def test_two_controllers_drive_different_joints_at_once(make_manager):
+    manager = make_manager()
+    manager.update_controller_input_events([axis(10, 0, 0.8), axis(11, 1, -0.7), axis(11, 2, 0.5)])
+    assert (manager.right_stick.x, manager.left_stick.x, manager.right_trigger.value) == (0.8, -0.7, 0.5)
+
+
+def test_stick_noise_inside_the_snap_doesnt_take_a_stick(make_manager):
+    manager = make_manager()
+    manager.update_controller_input_events([axis(10, 0, 0.1), axis(11, 0, 0.5)])
+    assert manager.right_stick.x == 0.5
+
+
+def test_buttons_are_pressed_if_any_controller_presses_them(make_manager):
+    manager = make_manager()
+    manager.update_controller_input_events([button(10, 0, True), axis(11, 0, 0.0)])
+    assert manager.button_a.value == 1
+    manager.update_controller_input_events([button(11, 0, True), button(10, 0, False)])
+    assert manager.button_a.value == 1
+    manager.update_controller_input_events([button(11, 0, False)])
+    assert manager.button_a.value == 0
+
+
+def test_pinned_controls_only_follow_their_slot(make_manager):
+    manager = make_manager(assignments={'right_stick.x': 0, 'left_stick.x': 1})
+    manager.update_controller_input_events([axis(10, 0, 0.0), axis(11, 0, 0.0)])
+    manager.update_controller_input_events([axis(11, 0, 0.9), axis(10, 1, 0.9)])
+    assert (manager.right_stick.x, manager.left_stick.x) == (0.0, 0.0)
+    manager.update_controller_input_events([axis(10, 0, 0.4), axis(11, 1, -0.4)])
+    assert (manager.right_stick.x, manager.left_stick.x) == (0.4, -0.4)
+
+
+def test_slots_stay_put_when_a_controller_is_unplugged(make_manager):
+    manager = make_manager(assignments={'right_stick.x': 1})
+    manager.update_controller_input_events([axis(10, 0, 0.0), axis(11, 0, 0.0), axis(12, 0, 0.0)])
+    manager.update_controller_input_events([pygame.event.Event(JOYDEVICEREMOVED, instance_id=10)])
+    assert manager.slots == [None, 11, 12]
+    manager.update_controller_input_events([axis(12, 0, 0.9), axis(11, 0, -0.3)])
+    assert manager.right_stick.x == -0.3
+    # a new controller fills the gap rather than going on the end
+    manager.update_controller_input_events([axis(13, 0, 0.0)])
+    assert manager.slots == [13, 11, 12]
+
+
+def test_a_controller_that_lets_go_after_unplugging_leaves_its_controls(make_manager):
+    manager = make_manager()
+    manager.update_controller_input_events([axis(10, 0, 0.9), axis(11, 0, 0.0)])
+    manager.update_controller_input_events([pygame.event.Event(JOYDEVICEREMOVED, instance_id=10)])
+    assert manager.right_stick.x == 0.0
+
+
+def test_a_replugged_pad_gets_its_old_slot_back(make_manager):
+    manager = make_manager()
+    manager.register_controller(20, 'pad a', 'guid-a')
+    manager.register_controller(21, 'pad b', 'guid-b')
+    manager.remove_joystick(20)
+    # SDL gives it a new instance id, but the same GUID
+    manager.register_controller(22, 'pad a', 'guid-a')
+    assert manager.slots == [22, 21]
+    assert manager.joystick == 'pad a'
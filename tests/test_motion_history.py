@@ -0,0 +1,39 @@
+import pytest
+
+from util.motion_history import MotionHistory
+
+
+def test_behaves_like_a_list_until_full():
+    history = MotionHistory(4)
+    history.append((1, 0.5))
+    history.append((2, 1.5))
+    assert len(history) == 2
+    assert list(history) == [(1, 0.5), (2, 1.5)]
+    assert history.pop() == (2, 1.5)
+    assert history.pop() == (1, 0.5)
+    assert not history
+
+
+def test_wraparound_overwrites_the_oldest():
+    history = MotionHistory(3)
+    for i in range(5):
+        history.append((i % 3, float(i)))
+    assert len(history) == 3
+    assert list(history) == [(2, 2.0), (0, 3.0), (1, 4.0)]
+    assert [history.pop() for i in range(3)] == [(1, 4.0), (0, 3.0), (2, 2.0)]
+
+
+def test_append_after_popping_a_wrapped_buffer():
+    history = MotionHistory(3)
+    for i in range(4):
+        history.append((1, float(i)))
+    history.pop()
+    history.append((2, 9.0))
+    assert list(history) == [(1, 1.0), (1, 2.0), (2, 9.0)]
+
+
+def test_pop_from_empty_and_bad_capacity():
+    with pytest.raises(IndexError):
+        MotionHistory(2).pop()
+    with pytest.raises(ValueError):
+        MotionHistory(0)
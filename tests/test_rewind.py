@@ -0,0 +1,42 @@
+from util.robot_arm import Motor
+
+
+def motor_with_history(commands):
+    "A Motor whose history holds 'commands', oldest first, as record_command would have saved them"
+    motor = Motor('Base')
+    for command in commands:
+        motor.past_motor_commands.append(command)
+    return motor
+
+
+def test_rewind_replays_moves_newest_first_and_reversed():
+    # idle 2s, direction 1 for 1s, stopped 0.5s, direction 2 for 0.3s; history stores each reversed
+    motor = motor_with_history([(0, 2.0), (2, 1.0), (0, 0.5), (1, 0.3)])
+    assert motor.rewind_events('base') == [(0.0, 'base', 1), (0.3, 'base', 0), (0.8, 'base', 2),
+                                           (1.8, 'base', 0)]
+    assert not motor.past_motor_commands
+
+
+def test_rewind_drops_commands_that_took_no_time():
+    motor = motor_with_history([(2, 0.5), (1, 0.0)])
+    assert motor.rewind_events('base') == [(0.0, 'base', 2), (0.5, 'base', 0)]
+
+
+def test_rewind_merges_repeated_directions_and_always_ends_stopped():
+    motor = motor_with_history([(1, 0.25), (1, 0.25)])
+    assert motor.rewind_events('grip') == [(0.0, 'grip', 1), (0.5, 'grip', 0)]
+    assert Motor('Grip').rewind_events('grip') == [(0.0, 'grip', 0)]
+
+
+def test_return_to_start_skips_the_idle_time_since_the_last_move():
+    from util.arm_devices import SimulatedArmDevice
+    from util.robot_arm import RobotArm
+
+    arm = RobotArm(device=SimulatedArmDevice())
+    # base ran in direction 1 for 50ms, then the arm sat idle for a minute
+    arm.rotate.past_motor_commands.append((2, 0.05))
+    arm.rotate.past_motor_commands.append((0, 60.0))
+    player = arm.return_to_start_position()
+    assert player.timeline[0] == (0.0, (('base', 2),))
+    assert abs(player.timeline[-1][0] - 0.05) < 1e-9
+    arm.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from util.trajectory import Trajectory
+
+
+def test_overlapping_moves_share_commands():
+    trajectory = Trajectory([('elbow', 1, 0.0, 1.5), ('wrist', 2, 0.5, 0.5), ('grip', 1, 1.5, 0.8)])
+    assert trajectory.timeline == [(0.0, (('elbow', 1),)),
+                                   (0.5, (('wrist', 2),)),
+                                   (1.0, (('wrist', 0),)),
+                                   (1.5, (('elbow', 0), ('grip', 1))),
+                                   (2.3, (('grip', 0),))]
+    assert trajectory.cycle_time == pytest.approx(2.3)
+    assert [command for offset, command in trajectory.commands] == [[16, 0, 0], [24, 0, 0], [16, 0, 0],
+                                                                    [1, 0, 0], [0, 0, 0]]
+
+
+def test_back_to_back_moves_of_a_joint_dont_stop_in_between():
+    trajectory = Trajectory([('base', 1, 0.0, 1.0), ('base', 1, 1.0, 0.5), ('base', 2, 1.5, 0.5)])
+    assert trajectory.timeline == [(0.0, (('base', 1),)), (1.5, (('base', 2),)), (2.0, (('base', 0),))]
+
+
+def test_changes_within_the_merge_window_go_out_together():
+    trajectory = Trajectory([('elbow', 1, 0.0, 1.0), ('wrist', 1, 0.0005, 1.0)], merge_window=0.001)
+    assert trajectory.timeline[0] == (0.0, (('elbow', 1), ('wrist', 1)))
+    assert len(trajectory.commands) == 2
+
+
+def test_bad_moves_are_refused():
+    with pytest.raises(ValueError):
+        Trajectory([('elbow', 1, 0.0, 1.0), ('elbow', 2, 0.5, 1.0)])
+    with pytest.raises(ValueError):
+        Trajectory([('knee', 1, 0.0, 1.0)])
+    with pytest.raises(ValueError):
+        Trajectory([('elbow', 3, 0.0, 1.0)])
+    with pytest.raises(ValueError):
+        Trajectory([('elbow', 1, 0.0, 0.0)])
@@ -0,0 +1,123 @@
+import ctypes
+import importlib
+import sys
+import time
+
+import pytest
+
+
+class FakeXInputDll(object):
+    "Stands in for xinput9_1_0.dll off Windows; reports whatever state the test sets"
+
+    def __init__(self):
+        self.packet_number = 0
+        self.buttons = 0
+        self.l_thumb_x = 0
+        self.connected = True
+
+    def XInputGetState(self, device_number, state_ref):
+        if device_number != 0 or not self.connected:
+            return 1167  # ERROR_DEVICE_NOT_CONNECTED
+        state = state_ref._obj
+        state.packet_number = self.packet_number
+        state.gamepad.buttons = self.buttons
+        state.gamepad.l_thumb_x = self.l_thumb_x
+        return 0
+
+
+class RecordingDispatcher(object):
+    def __init__(self, joystick):
+        self.events = []
+
+    def on_state_changed(self, state, value=None):
+        pass
+
+    def on_axis(self, axis, value=None):
+        self.events.append(('axis', axis, value))
+
+    def on_button(self, button, value=None):
+        self.events.append(('button', button, value))
+
+    def on_missed_packet(self, number, value=None):
+        self.events.append(('missed', number))
+
+
+@pytest.fixture
+def xinput(monkeypatch):
+    dll = FakeXInputDll()
+    if sys.platform != 'win32':
+        monkeypatch.setattr(ctypes, 'windll', type('windll', (), {'xinput9_1_0': dll}), raising=False)
+    sys.modules.pop('util.xinput', None)
+    module = importlib.import_module('util.xinput')
+    monkeypatch.setattr(module, 'xinput', dll)
+    module.fake_dll = dll
+    yield module
+    sys.modules.pop('util.xinput', None)
+
+
+def make_joystick(xinput, **settings):
+    return xinput.XInputJoystick(0, event_dispatcher_class=RecordingDispatcher, **settings)
+
+
+def test_only_changed_buttons_are_dispatched_lowest_first(xinput):
+    joystick = make_joystick(xinput)
+    xinput.fake_dll.packet_number = 1
+    xinput.fake_dll.buttons = 0b1000000000101
+    joystick.dispatch_events()
+    assert joystick.event.events == [('button', 1, 1), ('button', 3, 1), ('button', 13, 1)]
+
+    joystick.event.events = []
+    xinput.fake_dll.packet_number = 2
+    xinput.fake_dll.buttons = 0b0000000000110
+    joystick.dispatch_events()
+    assert joystick.event.events == [('button', 1, 0), ('button', 2, 1), ('button', 13, 0)]
+
+
+def test_nothing_is_dispatched_until_the_packet_number_changes(xinput):
+    joystick = make_joystick(xinput)
+    xinput.fake_dll.buttons = 1
+    joystick.dispatch_events()
+    assert joystick.event.events == []
+
+
+def test_axes_are_scaled_and_missed_packets_counted(xinput):
+    joystick = make_joystick(xinput)
+    xinput.fake_dll.packet_number = 4
+    xinput.fake_dll.l_thumb_x = 32767
+    joystick.dispatch_events()
+    assert ('missed', 3) in joystick.event.events
+    assert ('axis', 'l_thumb_x', 32767 / 65535.0) in joystick.event.events
+    assert joystick.poll_stats()['missed_packets'] == 3
+
+
+def test_poll_frequency_adapts_within_its_limits(xinput):
+    joystick = make_joystick(xinput, min_poll_frequency=400.0, max_poll_frequency=600.0)
+    assert joystick.adjust_poll_frequency(50, 10) == 600.0
+    assert joystick.adjust_poll_frequency(0, 0) == 600.0
+    for i in range(10):
+        joystick.adjust_poll_frequency(100, 0)
+    assert joystick.poll_frequency == 400.0
+    joystick.adaptive_polling = False
+    assert joystick.adjust_poll_frequency(1, 100) == 400.0
+
+
+def test_background_poller_queues_states_for_the_main_thread(xinput):
+    joystick = make_joystick(xinput, adaptive_polling=False)
+    joystick.start_polling(1000.0)
+    try:
+        xinput.fake_dll.packet_number = 1
+        xinput.fake_dll.buttons = 1
+        deadline = time.perf_counter() + 2.0
+        while not joystick.poller.states and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        joystick.dispatch_events()
+        assert joystick.event.events == [('button', 1, 1)]
+
+        xinput.fake_dll.connected = False
+        deadline = time.perf_counter() + 2.0
+        while joystick.poller.is_alive() and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        with pytest.raises(RuntimeError):
+            joystick.dispatch_events()
+    finally:
+        joystick.stop_polling()
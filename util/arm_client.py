@@ -0,0 +1,144 @@
+import socket
+from contextlib import contextmanager
+
+from util.arm_protocol import (REPLY, DEFAULT_PORT, MOTOR_NAMES, OP_MOVE, OP_LIGHT, OP_STOP, OP_MOVE_TO,
+                               OP_SNAPSHOT, STATUS_OK, encode_request, decode_reply)
+
+
+class ArmClient(object):
+    """
+    Drives a RobotArm served by an ArmServer, with the same move methods as
+    RobotArm. Needs nothing but the standard library, so it runs on a
+    supervisor host without pyusb or pygame.
+
+    Requests go out as soon as they're made, except inside batch(), which
+    sends everything made inside it in one write so the server applies it
+    all in the same tick. Only snapshot() waits for an answer; any requests
+    the server turned down are reported in 'errors' as
+    (opcode, status, request id) once snapshot() reads past them.
+
+    With udp set the requests go as datagrams: lower overhead, but a lost
+    request is simply lost and snapshot() raises socket.timeout if its answer
+    doesn't come back.
+
+    Example:
+    client = ArmClient('arm-host', 5535)
+    with client.batch():
+        client.move_elbow(1, 0.5)
+        client.move_wrist(2, 0.5)
+    print(client.snapshot())
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, udp=False, timeout=1.0):
+        if udp:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.socket = socket.create_connection((host, port), timeout)
+            # small frames must go straight out, not wait to be coalesced
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket.settimeout(timeout)
+        if udp:
+            self.socket.connect((host, port))
+        self.udp = udp
+
+        self.next_request_id = 0
+        self.pending = None
+        self.received = b''
+        self.errors = []
+
+    def close(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, opcode, motor=0, value=0, argument=0.0):
+        request_id = self.next_request_id
+        self.next_request_id = (request_id + 1) & 0xFFFF
+        frame = encode_request(opcode, motor, value, request_id, argument)
+        if self.pending is not None:
+            self.pending.append(frame)
+        elif self.udp:
+            self.socket.send(frame)
+        else:
+            self.socket.sendall(frame)
+        return request_id
+
+    @contextmanager
+    def batch(self):
+        "Send every request made inside the with block in one write"
+        outer = self.pending is not None
+        if not outer:
+            self.pending = []
+        try:
+            yield self
+        finally:
+            if not outer:
+                frames, self.pending = b''.join(self.pending), None
+                if frames:
+                    if self.udp:
+                        self.socket.send(frames)
+                    else:
+                        self.socket.sendall(frames)
+
+    def move_motor(self, motor, direction, time_to_move=-1.0):
+        if motor not in MOTOR_NAMES:
+            raise ValueError('Do not know how to move %s' % motor)
+        if direction not in range(0, 3):
+            raise ValueError('%s can only be set to stop (0), 1 or 2' % motor)
+        return self.send(OP_MOVE, MOTOR_NAMES.index(motor), direction, time_to_move)
+
+    def move_base(self, direction, time_to_move=-1.0):
+        return self.move_motor('base', direction, time_to_move)
+
+    def move_shoulder(self, direction, time_to_move=-1.0):
+        return self.move_motor('shoulder', direction, time_to_move)
+
+    def move_elbow(self, direction, time_to_move=-1.0):
+        return self.move_motor('elbow', direction, time_to_move)
+
+    def move_wrist(self, direction, time_to_move=-1.0):
+        return self.move_motor('wrist', direction, time_to_move)
+
+    def move_grip(self, direction, time_to_move=-1.0):
+        return self.move_motor('grip', direction, time_to_move)
+
+    def move_to(self, motor, target):
+        if motor not in MOTOR_NAMES:
+            raise ValueError('Do not know how to move %s' % motor)
+        return self.send(OP_MOVE_TO, MOTOR_NAMES.index(motor), 0, target)
+
+    def set_light(self, light_val):
+        if light_val not in range(0, 2):
+            raise ValueError('Light can only be set to off (0) or on (1)')
+        return self.send(OP_LIGHT, 0, light_val)
+
+    def reset(self):
+        return self.send(OP_STOP)
+
+    def snapshot(self):
+        "Returns (command bytes, {motor name: estimated position}) as the arm is right now"
+        if self.pending is not None:
+            raise RuntimeError('snapshot() would wait forever inside batch()')
+        request_id = self.send(OP_SNAPSHOT)
+        while True:
+            opcode, status, reply_id, command, positions = decode_reply(self.read_reply())
+            if status != STATUS_OK:
+                self.errors.append((opcode, status, reply_id))
+                if reply_id == request_id:
+                    raise IOError('Arm server turned down snapshot request %d with status %d' % (reply_id, status))
+            elif reply_id == request_id:
+                return bytearray(command), positions
+
+    def read_reply(self):
+        while len(self.received) < REPLY.size:
+            # a datagram may hold several replies, so read it whole
+            data = self.socket.recv(65536)
+            if not data and not self.udp:
+                raise IOError('Arm server closed the connection')
+            self.received += data
+        reply, self.received = self.received[:REPLY.size], self.received[REPLY.size:]
+        return reply
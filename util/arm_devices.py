@@ -0,0 +1,153 @@
+import platform
+import os
+import threading
+import time
+
+import usb.core
+import usb.backend
+
+# Product information for the arm
+VENDOR = 0x1267
+PRODUCT = 0x0000
+
+# Timeout for our instructions through pyusb
+TIMEOUT = 1000
+
+# Placeholder joint speeds in degrees per second and end stops in degrees from
+# the middle of each joint's travel. These are uncalibrated guesses, not
+# measurements: speeds vary from arm to arm and with battery charge, so time
+# each joint on your own arm and pass joint_speeds and joint_limits to RobotArm
+# before relying on the position estimates or soft limits. Direction 1 counts
+# as positive.
+DEFAULT_JOINT_SPEEDS = {'base': 20.0, 'shoulder': 12.0, 'elbow': 15.0, 'wrist': 25.0, 'grip': 30.0}
+DEFAULT_JOINT_LIMITS = {'base': (-135.0, 135.0), 'shoulder': (-90.0, 90.0), 'elbow': (-150.0, 150.0),
+                        'wrist': (-60.0, 60.0), 'grip': (-25.0, 25.0)}
+
+
+def encode_command(directions, light=0):
+    """
+    Pack a dict of joint directions and a light value into the same 3 bytes
+    RobotArm.build_command produces. Missing joints count as stopped.
+
+    >>> encode_command({'shoulder': 2, 'elbow': 1, 'base': 2}, 1)
+    [144, 2, 1]
+    """
+    shoulder_elbow = (directions.get('shoulder', 0) << 6) + (directions.get('elbow', 0) << 4)
+    wrist_grip = (directions.get('wrist', 0) << 2) + directions.get('grip', 0)
+    return [shoulder_elbow + wrist_grip, directions.get('base', 0), light]
+
+
+def decode_command(command):
+    """
+    Unpack a 3 byte command from RobotArm.build_command into a dict of
+    joint directions and the light value.
+
+    >>> decode_command([0x90, 2, 1])
+    ({'shoulder': 2, 'elbow': 1, 'wrist': 0, 'grip': 0, 'base': 2}, 1)
+    """
+    directions = {
+        'shoulder': (command[0] >> 6) & 0x3,
+        'elbow': (command[0] >> 4) & 0x3,
+        'wrist': (command[0] >> 2) & 0x3,
+        'grip': command[0] & 0x3,
+        'base': command[1] & 0x3,
+    }
+    return directions, command[2] & 0x1
+
+
+# RobotArm sends its commands to any object with a send_command(command)
+# method taking the 3 bytes from RobotArm.build_command, like the two devices
+# below. It may be called from the CommandWriter thread and should raise an
+# IOError when a transfer fails.
+
+
+class UsbArmDevice(object):
+    """The real arm, over pyusb"""
+
+    def __init__(self, device):
+        self.device = device
+        self.device.set_configuration()
+
+    @staticmethod
+    def find():
+        "Returns the connected arm, or None if there isn't one"
+        current_platform = platform.uname()[0].upper()
+        device = None
+        if current_platform == 'WINDOWS':
+            backend_dll_path = "libusb-1.0.dll"
+            if os.path.isfile(backend_dll_path):
+                backend = usb.backend.libusb1.get_backend(find_library=lambda x: backend_dll_path)
+                device = usb.core.find(idVendor=VENDOR, idProduct=PRODUCT, backend=backend)
+        else:
+            device = usb.core.find(idVendor=VENDOR, idProduct=PRODUCT)
+        if device:
+            return UsbArmDevice(device)
+        return None
+
+    def send_command(self, command):
+        self.device.ctrl_transfer(0x40, 6, 0x100, 0, command, TIMEOUT)
+
+
+class SimulatedArmDevice(object):
+    """
+    A pretend arm for testing and benchmarking without hardware.
+
+    Each command is decoded into joint directions and the joints move at
+    joint_speeds until they hit joint_limits, where they stall just like the
+    real gearboxes. Every transfer takes 'latency' seconds and, with record
+    set, is kept in received_commands as (time.perf_counter(), command bytes).
+
+    Example:
+    arm = RobotArm(device=SimulatedArmDevice(latency=0.002))
+    """
+
+    def __init__(self, latency=0.0, joint_speeds=None, joint_limits=None, record=True):
+        self.latency = latency
+        self.joint_speeds = dict(DEFAULT_JOINT_SPEEDS)
+        self.joint_speeds.update(joint_speeds or {})
+        self.joint_limits = dict(DEFAULT_JOINT_LIMITS)
+        self.joint_limits.update(joint_limits or {})
+        self.record = record
+
+        self.lock = threading.Lock()
+        self.positions = dict.fromkeys(self.joint_speeds, 0.0)
+        self.directions = dict.fromkeys(self.joint_speeds, 0)
+        # seconds each joint has spent driven against one of its end stops
+        self.time_at_limit = dict.fromkeys(self.joint_speeds, 0.0)
+        self.light = 0
+        self.last_move_time = time.perf_counter()
+
+        self.received_commands = []
+        self.transfer_count = 0
+
+    def send_command(self, command):
+        if self.latency > 0.0:
+            time.sleep(self.latency)
+        with self.lock:
+            now = time.perf_counter()
+            self.move_joints(now)
+            self.directions, self.light = decode_command(command)
+            self.transfer_count += 1
+            if self.record:
+                self.received_commands.append((now, bytes(bytearray(command))))
+
+    def move_joints(self, now):
+        elapsed = now - self.last_move_time
+        self.last_move_time = now
+        for joint, direction in self.directions.items():
+            if direction == 0:
+                continue
+            low, high = self.joint_limits[joint]
+            step = self.joint_speeds[joint] * elapsed
+            position = self.positions[joint] + (step if direction == 1 else -step)
+            if position > high or position < low:
+                overshoot = position - high if position > high else low - position
+                self.time_at_limit[joint] += min(elapsed, overshoot / self.joint_speeds[joint])
+                position = min(max(position, low), high)
+            self.positions[joint] = position
+
+    def joint_state(self):
+        "Returns (positions, directions, light) as they are right now"
+        with self.lock:
+            self.move_joints(time.perf_counter())
+            return dict(self.positions), dict(self.directions), self.light
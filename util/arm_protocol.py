@@ -0,0 +1,54 @@
+"""
+The binary protocol spoken between ArmServer and ArmClient.
+
+Every request is one fixed size REQUEST frame: opcode, motor number, value
+(direction or light), request id and a float argument (seconds for a timed
+move, degrees for OP_MOVE_TO). Frames can be sent back to back on a TCP
+stream or several to a UDP datagram. Only snapshots and failed requests are
+answered, each with one fixed size REPLY frame: opcode, status, the request
+id it answers, the 3 command bytes the arm is being sent and the estimated
+position of each joint in MOTOR_NAMES order.
+
+>>> decode_requests(encode_request(OP_MOVE, 2, 1, 7, 1.5) + encode_request(OP_LIGHT, 0, 1, 8))
+[(1, 2, 1, 7, 1.5), (2, 0, 1, 8, 0.0)]
+"""
+
+import struct
+
+REQUEST = struct.Struct('<BBBHf')  # opcode, motor, value, request id, seconds or degrees
+REPLY = struct.Struct('<BBH3s5f')  # opcode, status, request id, command bytes, joint positions
+
+DEFAULT_PORT = 5535
+
+# Motor numbers, as used in requests and the order of positions in replies
+MOTOR_NAMES = ('base', 'shoulder', 'elbow', 'wrist', 'grip')
+
+OP_MOVE = 1  # run 'motor' in direction 'value', for 'seconds' if positive
+OP_LIGHT = 2  # light off (0) or on (1)
+OP_STOP = 3  # stop everything, as RobotArm.reset
+OP_MOVE_TO = 4  # run 'motor' to the estimated position 'seconds' degrees
+OP_SNAPSHOT = 5  # reply with the current command and joint positions
+
+STATUS_OK = 0
+STATUS_BAD_OPCODE = 1
+STATUS_BAD_ARGUMENT = 2
+
+
+def encode_request(opcode, motor=0, value=0, request_id=0, argument=0.0):
+    return REQUEST.pack(opcode, motor, value, request_id & 0xFFFF, argument)
+
+
+def decode_requests(data):
+    "Every whole request frame in 'data', as (opcode, motor, value, request id, argument) tuples"
+    whole = len(data) - len(data) % REQUEST.size
+    return list(REQUEST.iter_unpack(data[:whole]))
+
+
+def encode_reply(opcode, status, request_id, command=(0, 0, 0), positions=(0.0,) * len(MOTOR_NAMES)):
+    return REPLY.pack(opcode, status, request_id & 0xFFFF, bytes(bytearray(command)), *positions)
+
+
+def decode_reply(data):
+    "(opcode, status, request id, command bytes, {motor name: position}) from one reply frame"
+    fields = REPLY.unpack(data)
+    return fields[0], fields[1], fields[2], fields[3], dict(zip(MOTOR_NAMES, fields[4:]))
@@ -0,0 +1,232 @@
+"""
+Drive a RobotArm over the network, so one supervisor host can run several
+arms. Speaks the util.arm_protocol frames over TCP and, optionally, UDP.
+
+Run an arm server from the repository root, with --simulated to try it out
+against a SimulatedArmDevice instead of the USB arm:
+python -m util.arm_server --port 5535 --simulated
+"""
+
+import argparse
+import asyncio
+import math
+import socket
+import time
+
+from util.arm_devices import SimulatedArmDevice
+from util.arm_protocol import (REQUEST, DEFAULT_PORT, MOTOR_NAMES, OP_MOVE, OP_LIGHT, OP_STOP, OP_MOVE_TO,
+                               OP_SNAPSHOT, STATUS_OK, STATUS_BAD_OPCODE, STATUS_BAD_ARGUMENT, encode_reply)
+from util.robot_arm import RobotArm
+
+
+class ArmServerProtocol(asyncio.Protocol):
+    "One TCP connection to an ArmServer"
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = b''
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info('socket')
+        if sock is not None:
+            # replies are tiny and someone is waiting on each one
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+
+    def connection_lost(self, exc):
+        self.server.connections -= 1
+
+    def data_received(self, data):
+        if self.buffer:
+            data = self.buffer + data
+        whole = len(data) - len(data) % REQUEST.size
+        self.buffer = data[whole:]
+        replies = self.server.handle_requests(data[:whole])
+        if replies:
+            self.transport.write(replies)
+
+
+class ArmServerDatagramProtocol(asyncio.DatagramProtocol):
+    "An ArmServer's UDP socket; each datagram holds one or more whole requests"
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        replies = self.server.handle_requests(data[:len(data) - len(data) % REQUEST.size])
+        if replies:
+            self.transport.sendto(replies, address)
+
+
+class ArmServer(object):
+    """
+    Serves one RobotArm to any number of TCP and UDP clients.
+
+    Requests are applied to the arm as soon as they arrive, but nothing is
+    sent to it until every request already received in this pass of the
+    event loop, from every client, has been applied; then one tick sends the
+    lot as a single build_command transfer. The server switches the arm to
+    batch_commands for this, and the arm should have threaded_transport set so
+    USB transfers never hold up the event loop.
+
+    While any motor runs the server keeps ticking tick_rate times a second,
+    so position estimates and soft limits stay up to date, and it wakes for
+    every timed move's deadline.
+
+    Example:
+    server = ArmServer(RobotArm(threaded_transport=True), port=5535, udp_port=5535)
+    asyncio.run(server.serve_forever())
+    """
+
+    def __init__(self, arm, host='127.0.0.1', port=DEFAULT_PORT, udp_port=None, tick_rate=100):
+        self.arm = arm
+        self.arm.batch_commands = True
+        self.host = host
+        self.port = port
+        self.udp_port = udp_port
+        self.tick_interval = 1.0 / tick_rate
+
+        self.loop = None
+        self.tcp_server = None
+        self.udp_transport = None
+        self.tick_handle = None
+        self.tick_when = None
+
+        self.connections = 0
+        self.requests = 0
+        self.ticks = 0
+
+    async def start(self):
+        "Start listening; returns once the sockets are open"
+        self.loop = asyncio.get_running_loop()
+        self.tcp_server = await self.loop.create_server(lambda: ArmServerProtocol(self), self.host, self.port)
+        if self.port == 0:
+            # let the OS pick, and remember what it picked
+            self.port = self.tcp_server.sockets[0].getsockname()[1]
+        if self.udp_port is not None:
+            self.udp_transport, protocol = await self.loop.create_datagram_endpoint(
+                lambda: ArmServerDatagramProtocol(self), local_addr=(self.host, self.udp_port))
+            if self.udp_port == 0:
+                self.udp_port = self.udp_transport.get_extra_info('sockname')[1]
+        return self
+
+    async def serve_forever(self):
+        if self.tcp_server is None:
+            await self.start()
+        try:
+            await self.tcp_server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        "Stop listening and stop the arm"
+        if self.tick_handle is not None:
+            self.tick_handle.cancel()
+            self.tick_handle = None
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+            self.udp_transport = None
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+            self.tcp_server = None
+        self.arm.reset()
+
+    def handle_requests(self, data):
+        "Apply every request frame in 'data', returning the replies to send back"
+        replies = []
+        for opcode, motor, value, request_id, argument in REQUEST.iter_unpack(data):
+            self.requests += 1
+            try:
+                status = self.handle_request(opcode, motor, value, argument)
+            except ValueError:
+                status = STATUS_BAD_ARGUMENT
+            if status != STATUS_OK:
+                replies.append(encode_reply(opcode, status, request_id))
+            elif opcode == OP_SNAPSHOT:
+                replies.append(self.snapshot(request_id))
+        self.schedule_tick(0.0)
+        return b''.join(replies)
+
+    def handle_request(self, opcode, motor, value, argument):
+        if opcode == OP_MOVE or opcode == OP_MOVE_TO:
+            # NaN or inf seconds would start a motor that nothing ever stops
+            if motor >= len(MOTOR_NAMES) or not math.isfinite(argument):
+                return STATUS_BAD_ARGUMENT
+            if opcode == OP_MOVE:
+                self.arm.move_motor(MOTOR_NAMES[motor], value, argument if argument > 0.0 else -1.0)
+            else:
+                self.arm.move_to(MOTOR_NAMES[motor], argument)
+        elif opcode == OP_LIGHT:
+            self.arm.set_light(value)
+        elif opcode == OP_STOP:
+            self.arm.reset()
+        elif opcode != OP_SNAPSHOT:
+            return STATUS_BAD_OPCODE
+        return STATUS_OK
+
+    def snapshot(self, request_id):
+        "A reply with the command the arm is on, including anything not sent yet, and its joint positions"
+        self.service()
+        positions = [self.arm.motors[name].position for name in MOTOR_NAMES]
+        return encode_reply(OP_SNAPSHOT, STATUS_OK, request_id, self.arm.build_command(), positions)
+
+    "Bring the arm's clock up to date, stopping any timed moves that are due"
+    def service(self):
+        now = time.perf_counter()
+        self.arm.update_time(now)
+
+    def schedule_tick(self, delay):
+        "Make sure a tick happens within 'delay' seconds; 0 means as soon as the event loop is free"
+        when = self.loop.time() + delay
+        if self.tick_handle is not None:
+            if self.tick_when <= when:
+                return
+            self.tick_handle.cancel()
+        self.tick_when = when
+        if delay <= 0.0:
+            self.tick_handle = self.loop.call_soon(self.tick)
+        else:
+            self.tick_handle = self.loop.call_later(delay, self.tick)
+
+    def tick(self):
+        self.tick_handle = None
+        self.ticks += 1
+        self.service()
+        self.arm.flush()
+
+        command = self.arm.last_sent_command
+        if command is not None and (command[0] != 0 or command[1] != 0):
+            self.schedule_tick(self.tick_interval)
+        else:
+            deadline = self.arm.next_motion_deadline()
+            if deadline is not None:
+                self.schedule_tick(deadline - time.perf_counter())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='TCP port')
+    parser.add_argument('--udp-port', type=int, help='also listen for UDP on this port')
+    parser.add_argument('--simulated', action='store_true', help='drive a SimulatedArmDevice, not the USB arm')
+    args = parser.parse_args()
+
+    device = SimulatedArmDevice(record=False) if args.simulated else None
+    arm = RobotArm(threaded_transport=True, device=device)
+    server = ArmServer(arm, args.host, args.port, args.udp_port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        arm.close()
+
+
+if __name__ == '__main__':
+    main()
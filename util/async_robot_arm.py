@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+
+class AsyncRobotArm(object):
+    """
+    asyncio facade over a RobotArm.
+
+    Timed moves start the motor straight away and then await the stop deadline
+    the arm has scheduled for them, so moves of different joints can run
+    together under asyncio.gather. Commands are still packed by the wrapped
+    arm's build_command and sent by its flush; create the arm with
+    threaded_transport=True so those sends never block the event loop.
+
+    Example:
+    arm = AsyncRobotArm(RobotArm(batch_commands=True, threaded_transport=True))
+    await asyncio.gather(arm.move_elbow(1, 0.5), arm.move_wrist(2, 1.5))
+    """
+
+    def __init__(self, arm):
+        self.arm = arm
+
+    "Bring the arm's clock up to date, stopping any moves that are due, and send the result"
+    def service(self):
+        now = time.perf_counter()
+        self.arm.update_time(now)
+        self.arm.flush()
+
+    async def move_motor(self, motor, direction, time_to_move=-1.0):
+        self.arm.move_motor(motor, direction, time_to_move)
+        self.arm.flush()
+
+        stop = self.arm.scheduled_stops.get(motor)
+        # finishes early if another move of the same motor replaces this one
+        while stop is not None and self.arm.scheduled_stops.get(motor) is stop:
+            await asyncio.sleep(max(0.0, stop[0] - time.perf_counter()))
+            self.service()
+
+    async def move_base(self, direction, time_to_move=-1.0):
+        await self.move_motor('base', direction, time_to_move)
+
+    async def move_shoulder(self, direction, time_to_move=-1.0):
+        await self.move_motor('shoulder', direction, time_to_move)
+
+    async def move_elbow(self, direction, time_to_move=-1.0):
+        await self.move_motor('elbow', direction, time_to_move)
+
+    async def move_wrist(self, direction, time_to_move=-1.0):
+        await self.move_motor('wrist', direction, time_to_move)
+
+    async def move_grip(self, direction, time_to_move=-1.0):
+        await self.move_motor('grip', direction, time_to_move)
+
+    async def move_to(self, motor, target):
+        direction, time_to_move = self.arm.motors[motor].move_to_target(target)
+        if direction != 0:
+            await self.move_motor(motor, direction, time_to_move)
+
+    async def wait_for_motion(self):
+        deadline = self.arm.next_motion_deadline()
+        while deadline is not None:
+            await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+            self.service()
+            deadline = self.arm.next_motion_deadline()
+
+    async def set_light(self, light_val):
+        self.arm.set_light(light_val)
+        self.arm.flush()
+
+    async def toggle_light(self):
+        self.arm.toggle_light()
+        self.arm.flush()
+
+    async def flash_light(self, iterations, interval):
+        for i in range(iterations):
+            await self.set_light(1)
+            await asyncio.sleep(interval)
+            await self.set_light(0)
+            await asyncio.sleep(interval)
+
+    async def reset(self):
+        self.arm.reset()
@@ -0,0 +1,89 @@
+import threading
+import time
+
+
+class CommandWriter(threading.Thread):
+    """
+    Background thread that owns the arm's device and sends it commands.
+
+    post() drops the newest command into a single slot mailbox, replacing any
+    command the thread has not picked up yet. The caller never blocks on USB and
+    a slow transfer only ever delays the most recent state, never a backlog.
+
+    A command whose transfer fails is tried again every retry_interval seconds
+    until it gets through or a newer command replaces it. The arm skips
+    commands that match the last one it posted, so giving up on a failed stop
+    would leave the motor running.
+    """
+
+    def __init__(self, device, retry_interval=0.01):
+        super(CommandWriter, self).__init__(name='RobotArmCommandWriter')
+        self.daemon = True
+        self.device = device
+
+        self.condition = threading.Condition()
+        self.pending_command = None
+        self.pending_trace = None
+        self.running = True
+        self.retry_interval = retry_interval
+
+        self.sent_commands = 0
+        self.dropped_commands = 0
+        self.failed_commands = 0
+        self.last_error = None
+        self.instrumentation = None
+
+    def post(self, command, input_trace=None):
+        "input_trace is (input time, flush time) for the oldest input this command answers, if it's being traced"
+        with self.condition:
+            if self.pending_command is not None:
+                self.dropped_commands += 1
+                # the new command carries on whatever input the dropped one was answering
+                if self.pending_trace is not None:
+                    input_trace = self.pending_trace
+            self.pending_command = command
+            self.pending_trace = input_trace
+            self.condition.notify()
+
+    def stop(self, timeout=None):
+        "Stop the thread once any pending command has been sent"
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending_command is None and self.running:
+                    self.condition.wait()
+                command = self.pending_command
+                input_trace = self.pending_trace
+                self.pending_command = None
+                self.pending_trace = None
+            if command is None:
+                return
+
+            try:
+                if self.instrumentation is not None:
+                    start_time = time.perf_counter()
+                    self.device.send_command(command)
+                    end_time = time.perf_counter()
+                    self.instrumentation.record_usb_transfer(end_time - start_time)
+                    if input_trace is not None:
+                        self.instrumentation.record_input_latency(input_trace[0], input_trace[1], end_time)
+                else:
+                    self.device.send_command(command)
+            except IOError as e:
+                # usb.core.USBError is an IOError; keep the thread alive and count it
+                self.failed_commands += 1
+                self.last_error = e
+                with self.condition:
+                    # a post or stop wakes us early, so a newer command is sent as soon as it arrives
+                    self.condition.wait(self.retry_interval)
+                    if self.pending_command is None and self.running:
+                        self.pending_command = command
+                        self.pending_trace = input_trace
+            else:
+                self.sent_commands += 1
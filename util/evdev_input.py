@@ -0,0 +1,183 @@
+"""
+Gamepad input read straight from the Linux kernel's evdev devices, for
+headless units where going through pygame's event queue ties input latency to
+the frame rate.
+
+Optional: needs the evdev package (pip install evdev) and read access to
+/dev/input/event*. Used by InputManager(backend='evdev').
+"""
+
+import collections
+import os
+import selectors
+import threading
+import time
+
+import pygame
+
+try:
+    import evdev
+    from evdev import ecodes
+except ImportError:
+    evdev = None
+
+# Kernel axis -> (state name, attribute), as the xpad driver and most other gamepad drivers report them
+EVDEV_AXIS_MAP = {'ABS_X': ('left_stick', 'x'), 'ABS_Y': ('left_stick', 'y'),
+                  'ABS_RX': ('right_stick', 'x'), 'ABS_RY': ('right_stick', 'y'),
+                  'ABS_Z': ('left_trigger', 'value'), 'ABS_RZ': ('right_trigger', 'value')}
+
+# Kernel button -> button name; the face buttons go by position, so NORTH is Y on an Xbox pad
+EVDEV_BUTTON_MAP = {'BTN_SOUTH': 'button_a', 'BTN_EAST': 'button_b', 'BTN_WEST': 'button_x',
+                    'BTN_NORTH': 'button_y', 'BTN_TL': 'button_left_bumper', 'BTN_TR': 'button_right_bumper',
+                    'BTN_SELECT': 'button_back', 'BTN_START': 'button_start', 'BTN_MODE': 'x_box_button',
+                    'BTN_THUMBL': 'button_left_stick', 'BTN_THUMBR': 'button_right_stick'}
+
+
+class EvdevReader(threading.Thread):
+    """
+    Reads every gamepad under /dev/input on its own thread, waiting on all of
+    them at once through a selector, and queues what they report.
+
+    'records' is a deque of (kind, device path, name, attribute, value,
+    input time) tuples for InputManager to drain on the main thread:
+    ('added', path, device name, ...) and ('removed', path, ...) as pads come
+    and go, and ('control', path, state or button name, attribute, value,
+    input time) as sticks, triggers and buttons change. Sticks are scaled to
+    -1..1 and triggers to 0..1. The input time is the kernel's timestamp for
+    the event moved onto time.perf_counter()'s clock, so latency traces start
+    from when the pad actually reported, not from when we got round to it.
+
+    Whenever the queue goes from empty to not, a wakeup_event_type event is
+    posted to pygame so a control loop asleep in pygame.event.wait comes round
+    to drain it. New pads are looked for every rescan_interval seconds.
+    """
+
+    def __init__(self, rescan_interval=1.0, max_queued=4096):
+        if evdev is None:
+            raise ImportError('The evdev input backend needs the evdev package: pip install evdev')
+        super(EvdevReader, self).__init__(name='EvdevReader')
+        self.daemon = True
+        self.rescan_interval = rescan_interval
+        self.records = collections.deque(maxlen=max_queued)
+        self.wakeup_event_type = pygame.event.custom_type()
+
+        # path -> (InputDevice, {axis code: (state name, attribute, minimum, range)})
+        self.devices = {}
+        # devices that turned out not to be gamepads, e.g. keyboards, so they aren't opened again every scan
+        self.rejected_paths = set()
+        self.button_codes = dict((ecodes.ecodes[code_name], button_name)
+                                 for code_name, button_name in EVDEV_BUTTON_MAP.items())
+        self.selector = selectors.DefaultSelector()
+        # stop() writes to this pipe to wake the selector
+        self.stop_read, self.stop_write = os.pipe()
+        self.selector.register(self.stop_read, selectors.EVENT_READ, None)
+        self.stopped = threading.Event()
+
+    def push(self, record):
+        wake = not self.records
+        self.records.append(record)
+        if wake:
+            try:
+                pygame.event.post(pygame.event.Event(self.wakeup_event_type))
+            except pygame.error:
+                # nobody is waiting on pygame's queue
+                pass
+
+    def scan(self):
+        "Open any gamepads that have appeared since the last scan"
+        paths = evdev.list_devices()
+        # forget rejected nodes that have gone, as the kernel may give the number to a gamepad next
+        self.rejected_paths.intersection_update(paths)
+        for path in paths:
+            if path in self.devices or path in self.rejected_paths:
+                continue
+            try:
+                device = evdev.InputDevice(path)
+                capabilities = device.capabilities(absinfo=True)
+            except OSError:
+                # gone already, or we aren't allowed to read it
+                continue
+            if ecodes.BTN_GAMEPAD not in capabilities.get(ecodes.EV_KEY, []):
+                device.close()
+                self.rejected_paths.add(path)
+                continue
+
+            axes = {}
+            for code, absinfo in capabilities.get(ecodes.EV_ABS, []):
+                # codes with several names come back as a list of them
+                code_names = ecodes.ABS.get(code, ())
+                if not isinstance(code_names, (list, tuple)):
+                    code_names = (code_names,)
+                for code_name in code_names:
+                    if code_name in EVDEV_AXIS_MAP and absinfo.max > absinfo.min:
+                        state_name, attribute = EVDEV_AXIS_MAP[code_name]
+                        axes[code] = (state_name, attribute, absinfo.min, float(absinfo.max - absinfo.min))
+            self.devices[path] = (device, axes)
+            self.selector.register(device.fd, selectors.EVENT_READ, path)
+            self.push(('added', path, device.name, None, None, time.perf_counter()))
+
+    def remove(self, path):
+        device, axes = self.devices.pop(path)
+        self.selector.unregister(device.fd)
+        try:
+            device.close()
+        except OSError:
+            pass
+        self.push(('removed', path, None, None, None, time.perf_counter()))
+
+    def read(self, path):
+        device, axes = self.devices[path]
+        try:
+            events = list(device.read())
+        except BlockingIOError:
+            return
+        except OSError:
+            # unplugged
+            self.remove(path)
+            return
+
+        # kernel timestamps are wall clock time
+        clock_offset = time.time() - time.perf_counter()
+        button_codes = self.button_codes
+        for event in events:
+            if event.type == ecodes.EV_ABS:
+                axis = axes.get(event.code)
+                if axis is None:
+                    continue
+                state_name, attribute, minimum, span = axis
+                value = (event.value - minimum) / span
+                if attribute != 'value':
+                    value = value * 2.0 - 1.0
+                self.push(('control', path, state_name, attribute, value, event.timestamp() - clock_offset))
+            elif event.type == ecodes.EV_KEY:
+                button_name = button_codes.get(event.code)
+                if button_name is not None:
+                    # 2 is the key repeating, which is still pressed
+                    self.push(('control', path, button_name, 'value', 1 if event.value else 0,
+                               event.timestamp() - clock_offset))
+
+    def run(self):
+        next_scan = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                now = time.perf_counter()
+                if now >= next_scan:
+                    self.scan()
+                    next_scan = now + self.rescan_interval
+                for key, mask in self.selector.select(max(0.0, next_scan - time.perf_counter())):
+                    if key.data is not None:
+                        self.read(key.data)
+        finally:
+            for path in list(self.devices):
+                self.remove(path)
+
+    def stop(self, timeout=1.0):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        os.write(self.stop_write, b'\0')
+        if self.is_alive():
+            self.join(timeout)
+        self.selector.close()
+        os.close(self.stop_read)
+        os.close(self.stop_write)
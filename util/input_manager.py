@@ -1,88 +1,313 @@
 import pygame
 import platform
-from operator import attrgetter
-from pygame.locals import *
+import time
+from pygame.locals import JOYAXISMOTION, JOYBUTTONDOWN, JOYBUTTONUP, JOYDEVICEADDED, JOYDEVICEREMOVED
+
+from util.evdev_input import EvdevReader
 
 current_platform = platform.uname()[0].upper()
 if current_platform == 'WINDOWS':
     import util.xinput as xinput
 
 
-class Struct(dict):
-    def __init__(self, **kwargs):
-        dict.__init__(self, **kwargs)
-        self.__dict__.update(**kwargs)
+# Where each joystick axis goes: axis number -> (state name, attribute)
+WINDOWS_AXIS_MAP = {0: ('left_stick', 'y'), 1: ('left_stick', 'x'), 2: ('left_trigger', 'value'),
+                    3: ('right_stick', 'y'), 4: ('right_stick', 'x'), 5: ('right_trigger', 'value')}
+# LTHUMBX = 0, LTHUMBY = 1, LTRIGGER = 2, RTHUMBX = 3, RTHUMBY = 4, RTRIGGER = 5
+DEFAULT_AXIS_MAP = {0: ('left_stick', 'x'), 1: ('left_stick', 'y'), 2: ('left_trigger', 'value'),
+                    3: ('right_stick', 'x'), 4: ('right_stick', 'y'), 5: ('right_trigger', 'value')}
+
+# Which button each joystick button number is, in button number order
+WINDOWS_BUTTON_MAP = ('button_a', 'button_b', 'button_x', 'button_y', 'button_left_bumper', 'button_right_bumper',
+                      'button_back', 'button_start', 'button_left_stick', 'button_right_stick')
+DEFAULT_BUTTON_MAP = ('button_a', 'button_b', 'button_x', 'button_y', 'button_left_bumper', 'button_right_bumper',
+                      'button_back', 'button_start', 'x_box_button', 'button_left_stick', 'button_right_stick')
+
+BUTTON_NAMES = ('button_a', 'button_b', 'button_x', 'button_y', 'button_left_bumper', 'button_right_bumper',
+                'button_back', 'button_start', 'button_left_stick', 'button_right_stick', 'x_box_button')
+
+INPUT_EVENT_TYPES = (JOYAXISMOTION, JOYBUTTONDOWN, JOYBUTTONUP)
+
+# Every analog control, named 'stick.axis' for InputManager's assignments
+AXIS_CONTROLS = (('right_stick', 'x'), ('right_stick', 'y'), ('left_stick', 'x'), ('left_stick', 'y'),
+                 ('right_trigger', 'value'), ('left_trigger', 'value'))
+
+
+class ButtonState(object):
+    __slots__ = ('key', 'value')
+
+    def __init__(self, key, value=0):
+        self.key = key
+        self.value = value
+
+
+class StickState(object):
+    __slots__ = ('key', 'x', 'y')
+
+    def __init__(self, key, x=0.0, y=0.0):
+        self.key = key
+        self.x = x
+        self.y = y
+
+
+class TriggerState(object):
+    __slots__ = ('key', 'value')
+
+    def __init__(self, key, value=0.0):
+        self.key = key
+        self.value = value
+
+
+class ControllerState(object):
+    """
+    The sticks, triggers and buttons of one controller, plus lookup tables,
+    indexed by axis and button number, that route each joystick event straight
+    to the value it changes.
+    """
+    __slots__ = ('right_stick', 'left_stick', 'right_trigger', 'left_trigger', 'buttons', 'controller_buttons',
+                 'axis_table', 'axes', 'snap')
+
+    def __init__(self, axis_map, button_map, snap=0.2):
+        self.right_stick = StickState(0)
+        self.left_stick = StickState(1)
+        self.right_trigger = TriggerState(2)
+        self.left_trigger = TriggerState(3)
+        self.snap = snap
+
+        # buttons missing from the map still exist, they just never get pressed
+        self.buttons = dict((name, ButtonState(None)) for name in BUTTON_NAMES)
+        self.controller_buttons = []
+        for number, name in enumerate(button_map):
+            button = self.buttons.setdefault(name, ButtonState(None))
+            button.key = number
+            self.controller_buttons.append(button)
+
+        # axis number -> (state, attribute, snap to centre?)
+        self.axis_table = [None] * (max(axis_map) + 1 if axis_map else 0)
+        for number, (state_name, attribute) in axis_map.items():
+            self.axis_table[number] = (getattr(self, state_name), attribute, attribute != 'value')
+
+        # (state, attribute) for each of AXIS_CONTROLS, in the same order
+        self.axes = [(getattr(self, state_name), attribute) for state_name, attribute in AXIS_CONTROLS]
+
+    def set_control(self, name, attribute, value):
+        "Set a stick, trigger or button by name, for input that doesn't come as pygame events"
+        button = self.buttons.get(name)
+        if button is not None:
+            button.value = value
+            return
+        if attribute != 'value' and -self.snap < value < self.snap:
+            value = 0.0
+        setattr(getattr(self, name), attribute, value)
+
+    def handle_event(self, event):
+        event_type = event.type
+        if event_type == JOYAXISMOTION:
+            if event.axis < len(self.axis_table):
+                target = self.axis_table[event.axis]
+                if target is not None:
+                    value = event.value
+                    # Feeble attempt to compensate for calibration and loose stick.
+                    if target[2] and -self.snap < value < self.snap:
+                        value = 0.0
+                    setattr(target[0], target[1], value)
+        elif event_type == JOYBUTTONDOWN:
+            if event.button < len(self.controller_buttons):
+                self.controller_buttons[event.button].value = 1
+        elif event_type == JOYBUTTONUP:
+            if event.button < len(self.controller_buttons):
+                self.controller_buttons[event.button].value = 0
 
 
 class InputManager(object):
-   
-    def __init__(self):
+    """
+    Reads every connected controller through pygame joystick events (or XInput
+    for Xbox 360 pads on Windows), picking up pads as they are plugged in and
+    dropping them when they are unplugged.
+
+    Each controller keeps its own ControllerState in 'controllers', keyed by
+    instance id. right_stick, left_stick, the triggers and the buttons are the
+    combined view the arm is driven from. Each controller gets the lowest free
+    slot number when it's connected and keeps it until it's unplugged; the
+    slots of the others don't move, and a pad plugged back in gets its old slot
+    back if nobody has taken it since. 'assignments' pins a control, named as in
+    AXIS_CONTROLS ('right_stick.x') or by button name, to one slot. Any control
+    not pinned belongs to whichever controller pushed it first, until that
+    controller lets go of it, so two operators can drive different joints at
+    once without fighting over them. A button is pressed if it's pressed on
+    any controller.
+
+    axis_map and button_map replace the platform's default tables, e.g.
+    InputManager(axis_map={0: ('right_stick', 'x'), 1: ('right_stick', 'y')})
+
+    XInput pads are sampled on background threads at xinput_poll_frequency
+    (xinput.DEFAULT_POLL_FREQUENCY if None), or once a frame if it's 0.
+
+    With backend='evdev', on Linux, pads are read straight from /dev/input by
+    an EvdevReader thread instead of through pygame, and input times are the
+    kernel's. This needs the evdev package. Call close() when done with it.
+    """
+
+    def __init__(self, axis_map=None, button_map=None, assignments=None, xinput_poll_frequency=None,
+                 backend='pygame'):
 
         self.platform = platform.uname()[0].upper()
+        if axis_map is None:
+            axis_map = WINDOWS_AXIS_MAP if self.platform == 'WINDOWS' else DEFAULT_AXIS_MAP
+        if button_map is None:
+            button_map = WINDOWS_BUTTON_MAP if self.platform == 'WINDOWS' else DEFAULT_BUTTON_MAP
+        self.axis_map = axis_map
+        self.button_map = button_map
+
+        # instance id -> joystick object and ControllerState, and the ids in slot order
+        self.joysticks = {}
+        self.controllers = {}
+        self.controller_order = []
+        # instance id in each slot, None for a free one, and (identity, slot) of unplugged pads
+        self.slots = []
+        self.controller_identities = {}
+        self.released_slots = []
+        self.assignments = dict(assignments or {})
+        self.xinput_poll_frequency = xinput_poll_frequency
+        # control name -> instance id of the controller currently driving it
+        self.owners = {}
+
+        # the combined state of all the controllers
+        self.state = ControllerState(axis_map, button_map)
+        self.right_stick = self.state.right_stick
+        self.left_stick = self.state.left_stick
+        self.right_trigger = self.state.right_trigger
+        self.left_trigger = self.state.left_trigger
+        self.controller_buttons = self.state.controller_buttons
+        for name, button in self.state.buttons.items():
+            setattr(self, name, button)
+        self.axis_names = ['%s.%s' % control for control in AXIS_CONTROLS]
+
+        # when the oldest joystick input not yet taken with take_input_time was read
+        self.input_time = None
+
         self.has_joystick = False
         self.joystick = None
+        self.windows_xbox_360 = False
+        # the XInput pads, which only report anything when polled, keyed ('xinput', device number)
+        self.xinput_ids = set()
+        # SDL's instance ids for the Xbox pads read through XInput instead, whose events are ignored
+        self.xinput_sdl_ids = set()
+
+        self.evdev_reader = None
+        if backend == 'evdev':
+            self.evdev_reader = EvdevReader()
+            self.evdev_reader.start()
+            return
+        elif backend != 'pygame':
+            raise ValueError('Unknown input backend %s' % backend)
+
+        pygame.joystick.init()
         if self.platform == 'WINDOWS':
-            pygame.joystick.init()
-
-            # Initialize a joystick object: grabs the first joystick
-            
-            windows_platform = current_platform == 'WINDOWS'
-            self.windows_xbox_360 = False
-            joysticks = xinput.XInputJoystick.enumerate_devices()
-            device_numbers = list(map(attrgetter('device_number'), joysticks))
-            self.joystick = None
-            
-            if device_numbers:
-                self.has_joystick = True
-                self.joystick = pygame.joystick.Joystick(device_numbers[0])
-                joystick_name = self.joystick.get_name().upper()
-                if 'XBOX 360' in joystick_name and windows_platform:
-                    self.windows_xbox_360 = True
-                    self.joystick = xinput.XInputJoystick(device_numbers[0])
-                else:
-                    # put other logic here for handling platform + device type in the event loop
-                    self.joystick.init()
-        else:
-            pygame.joystick.init()
-            # how many joysticks are there
-            if pygame.joystick.get_count() > 0:
-                # get the first joystick
-                self.joystick = pygame.joystick.Joystick(0)
-                if self.joystick is not None:
-                    # init that joystick
-                    self.joystick.init()
-                    self.has_joystick = True
-
-        self.button_a = Struct(key=0, value=0)
-        self.button_b = Struct(key=1, value=0)
-        self.button_x = Struct(key=2, value=0)
-        self.button_y = Struct(key=3, value=0)
-        self.button_left_bumper = Struct(key=4, value=0)
-        self.button_right_bumper = Struct(key=5, value=0)
-        self.button_back = Struct(key=6, value=0)
-        self.button_start = Struct(key=7, value=0)
-        self.button_left_stick = Struct(key=8, value=0)
-        self.button_right_stick = Struct(key=9, value=0)
-        self.x_box_button = Struct(key=10, value=0)
-        self.controller_buttons = [
-            self.button_a, self.button_b, self.button_x, self.button_y,
-            self.button_left_bumper, self.button_right_bumper,
-            self.button_back, self.button_start]
-        if self.platform == 'WINDOWS':
-            self.controller_buttons.append(self.button_left_stick)
-            self.controller_buttons.append(self.button_right_stick)
-        else:
-            self.x_box_button = Struct(key=8, value=0)
-            self.button_left_stick = Struct(key=9, value=0)
-            self.button_right_stick = Struct(key=10, value=0)
-            self.controller_buttons.append(self.x_box_button)
-            self.controller_buttons.append(self.button_left_stick)
-            self.controller_buttons.append(self.button_right_stick)
-
-        self.right_stick = Struct(key=0, x=0.0, y=0.0)
-        self.left_stick = Struct(key=1, x=0.0, y=0.0)
-        self.right_trigger = Struct(key=2, value=0.0)
-        self.left_trigger = Struct(key=3, value=0.0)
+            for joystick in xinput.XInputJoystick.enumerate_devices():
+                self.add_xinput_joystick(joystick)
+        # pygame also sends JOYDEVICEADDED for these, which add_joystick ignores as duplicates
+        for device_index in range(pygame.joystick.get_count()):
+            self.add_joystick(device_index)
+
+    # -----------------------------------------------------
+    # Start reading a newly plugged in joystick
+    # -----------------------------------------------------
+    def add_joystick(self, device_index):
+        if self.evdev_reader is not None:
+            # the reader has it already; opening it in pygame too would double up its input
+            return
+        joystick = pygame.joystick.Joystick(device_index)
+        instance_id = joystick.get_instance_id()
+        if self.platform == 'WINDOWS' and 'XBOX 360' in joystick.get_name().upper():
+            # read through XInput instead, which handles the triggers properly
+            joystick.quit()
+            self.xinput_sdl_ids.add(instance_id)
+            for xinput_joystick in xinput.XInputJoystick.enumerate_devices():
+                if xinput_joystick.instance_id not in self.joysticks:
+                    self.add_xinput_joystick(xinput_joystick)
+            return
+        if instance_id in self.joysticks:
+            return
+        joystick.init()
+        # SDL gives a replugged pad a new instance id, but its GUID stays the same
+        identity = joystick.get_guid() if hasattr(joystick, 'get_guid') else joystick.get_name()
+        self.register_controller(instance_id, joystick, identity)
+
+    def add_xinput_joystick(self, joystick):
+        if self.xinput_poll_frequency is None:
+            joystick.start_polling()
+        elif self.xinput_poll_frequency > 0:
+            joystick.start_polling(self.xinput_poll_frequency)
+        self.xinput_ids.add(joystick.instance_id)
+        self.windows_xbox_360 = True
+        self.register_controller(joystick.instance_id, joystick)
+
+    def register_controller(self, instance_id, joystick, identity=None):
+        self.joysticks[instance_id] = joystick
+        if instance_id not in self.controllers:
+            self.add_controller(instance_id, identity)
+        self.has_joystick = True
+        self.choose_joystick()
+
+    def add_controller(self, instance_id, identity=None):
+        "Give a new controller its state and a slot, returning the state"
+        if identity is None:
+            identity = instance_id
+        slot = None
+        for released_identity, released_slot in self.released_slots:
+            if released_identity == identity:
+                # plugged back in, so it goes back to its old slot
+                slot = released_slot
+                break
+        if slot is None:
+            # the lowest free slot, leaving the ones unplugged pads may come back for till last
+            reserved = set(released_slot for released_identity, released_slot in self.released_slots)
+            free = [index for index, owner in enumerate(self.slots) if owner is None]
+            unreserved = [index for index in free if index not in reserved]
+            if free:
+                slot = (unreserved or free)[0]
+            else:
+                slot = len(self.slots)
+                self.slots.append(None)
+        self.slots[slot] = instance_id
+        # whoever was waiting to come back to this slot has lost it now
+        self.released_slots = [released for released in self.released_slots if released[1] != slot]
+        self.controller_identities[instance_id] = identity
+        self.controller_order = [owner for owner in self.slots if owner is not None]
+
+        controller = ControllerState(self.axis_map, self.button_map)
+        self.controllers[instance_id] = controller
+        return controller
+
+    def choose_joystick(self):
+        "The joystick in the lowest slot is the one that 'joystick' refers to"
+        self.joystick = None
+        for instance_id in self.controller_order:
+            if instance_id in self.joysticks:
+                self.joystick = self.joysticks[instance_id]
+                break
+
+    # -----------------------------------------------------
+    # Forget an unplugged joystick and let go of its controls
+    # -----------------------------------------------------
+    def remove_joystick(self, instance_id):
+        joystick = self.joysticks.pop(instance_id, None)
+        if instance_id in self.xinput_ids:
+            joystick.stop_polling()
+        if self.controllers.pop(instance_id, None) is not None:
+            slot = self.slots.index(instance_id)
+            # the slot stays empty, so nobody else's slot number moves
+            self.slots[slot] = None
+            self.released_slots.append((self.controller_identities.pop(instance_id), slot))
+            self.controller_order = [owner for owner in self.slots if owner is not None]
+        for name, owner in list(self.owners.items()):
+            if owner == instance_id:
+                del self.owners[name]
+        self.xinput_ids.discard(instance_id)
+        self.windows_xbox_360 = bool(self.xinput_ids)
+        self.has_joystick = bool(self.joysticks)
+        self.choose_joystick()
 
     @staticmethod
     def stick_center_snap(value, snap=0.2):
@@ -92,68 +317,172 @@ class InputManager(object):
         else:
             return 0.0
 
+    # -----------------------------------------------------
+    # Is any stick or trigger pushed past the threshold?
+    # -----------------------------------------------------
+    def is_active(self, threshold):
+        return (abs(self.left_stick.x) > threshold or abs(self.left_stick.y) > threshold or
+                abs(self.right_stick.x) > threshold or abs(self.right_stick.y) > threshold or
+                self.left_trigger.value > threshold or self.right_trigger.value > threshold)
+
+    # -----------------------------------------------------
+    # Does the joystick only report input when we poll it?
+    # -----------------------------------------------------
+    def needs_polling(self):
+        return self.platform == 'WINDOWS' and self.windows_xbox_360
+
+    # -----------------------------------------------------
+    # When did the input we haven't acted on yet arrive?
+    # -----------------------------------------------------
+    def take_input_time(self):
+        input_time = self.input_time
+        self.input_time = None
+        return input_time
+
     # -----------------------------------------------------
     # Listen for, process and store input events
     # -----------------------------------------------------
-    def update_controller_input_events(self, events):
-        if self.platform == 'WINDOWS':
-            if self.windows_xbox_360:
-                self.joystick.dispatch_events()
-
-            for event in events: 
-                if event.type == JOYAXISMOTION:
-                    if event.axis == 0:  # the left stick y
-                        self.left_stick.y = self.stick_center_snap(event.value)
-                    elif event.axis == 1:  # the left stick x
-                        self.left_stick.x = self.stick_center_snap(event.value)
-                    elif event.axis == 3:  # the right stick y
-                        self.right_stick.y = self.stick_center_snap(event.value)
-                    elif event.axis == 4:  # the right stick x
-                        self.right_stick.x = self.stick_center_snap(event.value)
-                    elif event.axis == 5:  # right trigger
-                        self.right_trigger.value = event.value
-                    elif event.axis == 2:  # left trigger
-                        self.left_trigger.value = event.value
-
-                elif event.type == JOYBUTTONDOWN:
-                    self.controller_buttons[event.button].value = 1
-                elif event.type == JOYBUTTONUP:
-                    self.controller_buttons[event.button].value = 0
-        else:
-            # LTHUMBX = 0
-            # LTHUMBY = 1
-            # LTRIGGER = 2
-            # RTHUMBX = 3
-            # RTHUMBY = 4
-            # RTRIGGER = 5
-            # A = 6
-            # B = 7
-            # X = 8
-            # Y = 9
-            # LB = 10
-            # RB = 11
-            # BACK = 12
-            # START = 13
-            # XBOX = 14
-            # LEFTTHUMB = 15
-            # RIGHTTHUMB = 16
-            # DPAD = 17
-            for event in events: 
-                if event.type == JOYAXISMOTION:
-                    if event.axis == 1:  # the left stick y
-                        self.left_stick.y = self.stick_center_snap(event.value)
-                    elif event.axis == 0:  # the left stick x
-                        self.left_stick.x = self.stick_center_snap(event.value)
-                    elif event.axis == 4:  # the right stick y
-                        self.right_stick.y = self.stick_center_snap(event.value)
-                    elif event.axis == 3:  # the right stick x
-                        self.right_stick.x = self.stick_center_snap(event.value)
-                    elif event.axis == 5:  # right trigger
-                        self.right_trigger.value = event.value
-                    elif event.axis == 2:  # left trigger
-                        self.left_trigger.value = event.value
-
-                elif event.type == JOYBUTTONDOWN:
-                    self.controller_buttons[event.button].value = 1
-                elif event.type == JOYBUTTONUP:
-                    self.controller_buttons[event.button].value = 0
+    def update_controller_input_events(self, events, poll_time=None):
+        if self.input_time is None:
+            for event in events:
+                if event.type in INPUT_EVENT_TYPES:
+                    self.input_time = poll_time if poll_time is not None else time.perf_counter()
+                    break
+
+        if self.windows_xbox_360:
+            for instance_id in list(self.xinput_ids):
+                try:
+                    self.joysticks[instance_id].dispatch_events()
+                except RuntimeError:
+                    # unplugged since the last poll
+                    self.remove_joystick(instance_id)
+
+        changed = False
+        if self.evdev_reader is not None:
+            changed = self.drain_evdev_records()
+
+        controller = None
+        controller_id = None
+        for event in events:
+            event_type = event.type
+            if event_type in INPUT_EVENT_TYPES:
+                # events posted by hand, rather than by SDL, may only say which 'joy' they're from
+                instance_id = getattr(event, 'instance_id', event.joy)
+                if instance_id in self.xinput_sdl_ids:
+                    # SDL's view of a pad XInput is already reading, with different axis numbers
+                    continue
+                if instance_id != controller_id:
+                    controller_id = instance_id
+                    controller = self.controllers.get(controller_id)
+                    if controller is None:
+                        # a joystick someone else opened; it still gets a slot of its own
+                        controller = self.add_controller(controller_id)
+                controller.handle_event(event)
+                changed = True
+            elif event_type == JOYDEVICEADDED:
+                self.add_joystick(event.device_index)
+            elif event_type == JOYDEVICEREMOVED:
+                if event.instance_id in self.xinput_sdl_ids:
+                    # the XInput side notices for itself when its next poll fails
+                    self.xinput_sdl_ids.discard(event.instance_id)
+                    continue
+                self.remove_joystick(event.instance_id)
+                controller_id = None
+                changed = True
+
+        if changed:
+            self.arbitrate()
+
+    # -----------------------------------------------------
+    # Apply what the evdev reader has seen since the last frame
+    # -----------------------------------------------------
+    def drain_evdev_records(self):
+        records = self.evdev_reader.records
+        changed = False
+        while records:
+            kind, path, name, attribute, value, input_time = records.popleft()
+            if kind == 'control':
+                controller = self.controllers.get(path)
+                if controller is not None:
+                    controller.set_control(name, attribute, value)
+                    if self.input_time is None:
+                        self.input_time = input_time
+            elif kind == 'added':
+                # the event node can change when a pad is replugged, so it's known again by name
+                self.register_controller(path, name, name)
+            elif kind == 'removed':
+                self.remove_joystick(path)
+            changed = True
+        return changed
+
+    # -----------------------------------------------------
+    # Stop the threads reading controllers
+    # -----------------------------------------------------
+    def close(self):
+        if self.evdev_reader is not None:
+            self.evdev_reader.stop()
+            self.evdev_reader = None
+        for instance_id in self.xinput_ids:
+            self.joysticks[instance_id].stop_polling()
+
+    # -----------------------------------------------------
+    # Combine the controllers into the state the arm is driven from
+    # -----------------------------------------------------
+    def arbitrate(self):
+        controllers = self.controllers
+        order = self.controller_order
+        if len(order) == 1 and not self.assignments:
+            only = controllers[order[0]]
+            for (target, attribute), (source, _) in zip(self.state.axes, only.axes):
+                setattr(target, attribute, getattr(source, attribute))
+            for target, source in zip(self.controller_buttons, only.controller_buttons):
+                target.value = source.value
+            return
+
+        snap = self.state.snap
+        for index, (target, attribute) in enumerate(self.state.axes):
+            name = self.axis_names[index]
+            is_stick = attribute != 'value'
+            owner = self.assigned_controller(name)
+            if owner is None:
+                owner = self.owners.get(name)
+                if owner is None or not self.is_pushed(controllers[owner].axes[index], is_stick, snap):
+                    # up for grabs: the first controller pushing it takes it
+                    owner = None
+                    for instance_id in order:
+                        if self.is_pushed(controllers[instance_id].axes[index], is_stick, snap):
+                            owner = instance_id
+                            break
+                    if owner is None:
+                        self.owners.pop(name, None)
+                    else:
+                        self.owners[name] = owner
+            if owner is not None:
+                source = controllers[owner].axes[index]
+                setattr(target, attribute, getattr(source[0], source[1]))
+            elif order:
+                # nobody is pushing it, so it reads as the first controller's resting value
+                source = controllers[order[0]].axes[index]
+                setattr(target, attribute, getattr(source[0], source[1]))
+            else:
+                setattr(target, attribute, 0.0)
+
+        for number, target in enumerate(self.controller_buttons):
+            owner = self.assigned_controller(self.button_map[number])
+            if owner is not None:
+                target.value = controllers[owner].controller_buttons[number].value
+            else:
+                target.value = 1 if any(controllers[instance_id].controller_buttons[number].value
+                                        for instance_id in order) else 0
+
+    def assigned_controller(self, name):
+        "The instance id of the controller 'name' is pinned to, or None if it isn't pinned or that slot is empty"
+        slot = self.assignments.get(name)
+        if slot is None or slot >= len(self.slots):
+            return None
+        return self.slots[slot]
+
+    @staticmethod
+    def is_pushed(axis, is_stick, snap):
+        value = getattr(axis[0], axis[1])
+        return value != 0.0 if is_stick else value > snap
@@ -0,0 +1,115 @@
+import time
+from array import array
+
+
+class StageTimer(object):
+    """The most recent 'capacity' timings of one stage, in seconds, kept in a ring buffer"""
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.samples = array('d', [0.0]) * capacity
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples[self.count % self.capacity] = seconds
+        self.count += 1
+
+    def summary(self):
+        "count, p50, p99 and max of the samples, in seconds"
+        samples = sorted(self.samples[:min(self.count, self.capacity)])
+        if not samples:
+            return {'count': 0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        return {'count': self.count,
+                'p50': samples[int(0.50 * (len(samples) - 1))],
+                'p99': samples[int(0.99 * (len(samples) - 1))],
+                'max': samples[-1]}
+
+
+class Instrumentation(object):
+    """
+    Per-stage timings for the control loop.
+
+    Anything that can be instrumented has an 'instrumentation' attribute that
+    is None until one of these is handed to it, and checks for None before
+    timing anything, so leaving it off costs a single attribute test.
+
+    Stages:
+    loop   - one pass of the control loop, not counting time spent waiting
+    input  - handling pygame and controller events
+    render - drawing and updating the display
+    usb    - each send_command/ctrl_transfer to the arm
+
+    and, for inputs traced through to the arm with RobotArm.trace_input:
+    poll         - the gap between event polls while the loop is running, the longest an input
+                   can sit unread; passes that slept in pygame.event.wait aren't counted
+    input_wait   - from reading an input to flushing the command it caused
+    transfer     - from that flush to the transfer completing, including the writer thread
+    input_to_usb - from reading an input to the transfer completing
+    """
+    stage_names = ('loop', 'input', 'render', 'usb', 'poll', 'input_wait', 'transfer', 'input_to_usb')
+
+    def __init__(self, capacity=4096):
+        self.stages = dict((name, StageTimer(capacity)) for name in self.stage_names)
+        self.usb_transfers = 0
+
+        self.overlay_font = None
+        self.overlay_surfaces = []
+        self.next_overlay_refresh = 0.0
+        self.overlay_rect = None
+
+    def record(self, stage, seconds):
+        self.stages[stage].add(seconds)
+
+    def record_usb_transfer(self, seconds):
+        self.usb_transfers += 1
+        self.stages['usb'].add(seconds)
+
+    def record_input_latency(self, input_time, flush_time, sent_time):
+        self.stages['input_wait'].add(flush_time - input_time)
+        self.stages['transfer'].add(sent_time - flush_time)
+        self.stages['input_to_usb'].add(sent_time - input_time)
+
+    def snapshot(self):
+        "A dict of each stage's summary, plus the USB transfer count"
+        stats = dict((name, stage.summary()) for name, stage in self.stages.items())
+        stats['usb_transfers'] = self.usb_transfers
+        return stats
+
+    def render_overlay(self, screen, background=None, refresh_interval=0.5):
+        """
+        Draw the stats in the bottom left corner of the screen, clear of the
+        arm's motor labels, returning the rect that changed. The overlay's
+        width follows the text, so whatever the last one covered is first put
+        back from 'background', the screen as it is without the overlay.
+        """
+        import pygame
+
+        now = time.perf_counter()
+        if now >= self.next_overlay_refresh:
+            # sorting for percentiles isn't free, so the text only changes a couple of times a second
+            if self.overlay_font is None:
+                self.overlay_font = pygame.font.Font(None, 18)
+            stats = self.snapshot()
+            lines = ['%-12s p50 %6.2fms  p99 %6.2fms' % (name, stats[name]['p50'] * 1000.0,
+                                                        stats[name]['p99'] * 1000.0)
+                     for name in self.stage_names]
+            lines.append('usb transfers %d' % stats['usb_transfers'])
+            self.overlay_surfaces = [self.overlay_font.render(line, True, (0, 0, 0)) for line in lines]
+            self.next_overlay_refresh = now + refresh_interval
+
+        width = max([surface.get_width() for surface in self.overlay_surfaces] or [0]) + 10
+        height = sum([surface.get_height() for surface in self.overlay_surfaces]) + 10
+        overlay_rect = pygame.Rect(0, 0, width, height)
+        overlay_rect.bottomleft = screen.get_rect().bottomleft
+        dirty_rect = overlay_rect
+        if self.overlay_rect is not None and background is not None:
+            screen.blit(background, self.overlay_rect, self.overlay_rect)
+            dirty_rect = overlay_rect.union(self.overlay_rect)
+        pygame.draw.rect(screen, (255, 255, 200), overlay_rect)
+
+        y = overlay_rect.top + 5
+        for surface in self.overlay_surfaces:
+            screen.blit(surface, (overlay_rect.left + 5, y))
+            y += surface.get_height()
+        self.overlay_rect = overlay_rect
+        return dirty_rect
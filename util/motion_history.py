@@ -0,0 +1,55 @@
+from array import array
+
+
+class MotionHistory(object):
+    """
+    A fixed size ring buffer of (direction, duration) motor commands, stored
+    in two arrays rather than as a list of tuples. Once it is full each new
+    command overwrites the oldest one, so memory use stays flat however long
+    the arm runs - rewinding can then only go back 'capacity' commands.
+
+    It behaves like the list it replaces: append a tuple, pop the newest one.
+    """
+
+    def __init__(self, capacity=16384):
+        if capacity < 1:
+            raise ValueError('MotionHistory capacity must be at least 1')
+        self.capacity = capacity
+        self.directions = array('b', [0]) * capacity
+        self.durations = array('d', [0.0]) * capacity
+        self.start = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length != 0
+
+    def __iter__(self):
+        "Oldest command first"
+        for i in range(self.length):
+            index = (self.start + i) % self.capacity
+            yield self.directions[index], self.durations[index]
+
+    def append(self, command):
+        index = (self.start + self.length) % self.capacity
+        self.directions[index] = command[0]
+        self.durations[index] = command[1]
+        if self.length == self.capacity:
+            # full, so that write replaced the oldest command
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.length += 1
+
+    def pop(self):
+        "Remove and return the newest command"
+        if not self.length:
+            raise IndexError('pop from empty MotionHistory')
+        self.length -= 1
+        index = (self.start + self.length) % self.capacity
+        return self.directions[index], self.durations[index]
+
+    def clear(self):
+        self.start = 0
+        self.length = 0
@@ -0,0 +1,110 @@
+"""
+Record the commands sent to a RobotArm to a file and play them back later.
+
+A recording is an 8 byte header followed by fixed size 11 byte records, each a
+little endian double timestamp (seconds since recording began) and the 3
+command bytes from RobotArm.build_command. Files are only ever appended to, so
+a recording can be extended over several sessions.
+
+Example:
+recorder = MotionRecorder('pick_and_place.owi')
+recorder.attach(arm)
+... drive the arm with the gamepad ...
+recorder.close()
+
+replay_recording(arm, 'pick_and_place.owi')
+"""
+
+import mmap
+import os
+import struct
+import time
+
+from util.arm_devices import decode_command
+from util.motion_timeline import TimelinePlayer
+
+RECORDING_MAGIC = b'OWIR'
+RECORDING_VERSION = 1
+HEADER = struct.Struct('<4sHH')  # magic, version, record size
+RECORD = struct.Struct('<d3s')  # timestamp, command bytes
+
+
+class MotionRecorder(object):
+    """Appends every distinct command an arm sends to a recording file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.arm = None
+        # carry on from the end of an existing recording rather than starting back at zero
+        self.time_offset = 0.0
+        if os.path.isfile(path) and os.path.getsize(path) >= HEADER.size + RECORD.size:
+            with open(path, 'rb') as recording:
+                recording.seek(HEADER.size + ((os.path.getsize(path) - HEADER.size) // RECORD.size - 1) * RECORD.size)
+                self.time_offset = RECORD.unpack(recording.read(RECORD.size))[0]
+
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, RECORD.size))
+        self.start_time = time.perf_counter()
+
+    def attach(self, arm):
+        self.detach()
+        self.arm = arm
+        arm.command_listeners.append(self.record)
+        # start from whatever the arm is already doing
+        self.record(arm.build_command(), time.perf_counter())
+
+    def detach(self):
+        if self.arm is not None:
+            self.arm.command_listeners.remove(self.record)
+            self.arm = None
+
+    def record(self, command, timestamp):
+        timestamp = self.time_offset + timestamp - self.start_time
+        self.file.write(RECORD.pack(timestamp, bytes(bytearray(command))))
+
+    def close(self):
+        if self.arm is not None:
+            # end on every motor stopped, so a recording closed mid-move doesn't replay as running forever
+            command = self.arm.build_command()
+            command[0] = command[1] = 0
+            self.record(command, time.perf_counter())
+        self.detach()
+        self.file.close()
+
+
+def read_recording(path):
+    """
+    Yields (timestamp, command) for each record in a recording file. The file
+    is memory mapped, so only the part being read needs to be in memory.
+    """
+    with open(path, 'rb') as recording:
+        size = os.fstat(recording.fileno()).st_size
+        if size < HEADER.size:
+            return
+        with mmap.mmap(recording.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, record_size = HEADER.unpack_from(data, 0)
+            if magic != RECORDING_MAGIC or record_size != RECORD.size:
+                raise ValueError('%s is not a robot arm recording' % path)
+            for offset in range(HEADER.size, size - RECORD.size + 1, RECORD.size):
+                timestamp, command = RECORD.unpack_from(data, offset)
+                yield timestamp, bytearray(command)
+
+
+def recording_timeline(path):
+    "The recording as (offset, changes) events for a TimelinePlayer, with the first record at offset zero"
+    start_time = None
+    for timestamp, command in read_recording(path):
+        if start_time is None:
+            start_time = timestamp
+        directions, light = decode_command(command)
+        yield timestamp - start_time, tuple(directions.items()) + (('light', light),)
+
+
+def replay_recording(arm, path, background=False):
+    "Play a recording back through 'arm'. Returns the TimelinePlayer, already finished unless background is set"
+    player = TimelinePlayer(arm, recording_timeline(path))
+    if background:
+        return player.start()
+    player.run()
+    return player
@@ -0,0 +1,75 @@
+import heapq
+import threading
+import time
+
+
+def merge_motor_events(motor_events, merge_window=0.001):
+    """
+    Merge several motors' (offset, motor name, direction) event lists, each
+    already in time order, into one timeline of (offset, changes) where
+    'changes' is a tuple of (motor name, direction) pairs. Changes less than
+    merge_window seconds apart are sent together as one command.
+
+    >>> merge_motor_events([[(0.0, 'elbow', 1), (1.0, 'elbow', 0)], [(0.0, 'grip', 2), (0.5, 'grip', 0)]])
+    [(0.0, (('elbow', 1), ('grip', 2))), (0.5, (('grip', 0),)), (1.0, (('elbow', 0),))]
+    """
+    timeline = []
+    for offset, motor, direction in heapq.merge(*motor_events):
+        if timeline and offset - timeline[-1][0] < merge_window:
+            timeline[-1][1].append((motor, direction))
+        else:
+            timeline.append((offset, [(motor, direction)]))
+    return [(offset, tuple(changes)) for offset, changes in timeline]
+
+
+class TimelinePlayer(object):
+    """
+    Plays a timeline of (offset, changes) events on a RobotArm, sleeping until
+    each event is due and then sending all of its changes as one command. The
+    timeline can be any iterable in time order, including a generator.
+    Offsets are seconds from the start of play, and 'changes' are
+    (motor name or 'light', value) pairs for RobotArm.apply_motor_directions.
+
+    run() plays in the calling thread, start() plays in a background thread.
+    Either can be stopped early with cancel(). The motors are stopped when the
+    timeline runs out or is cancelled, so a timeline that ends mid-move can't
+    leave a motor running.
+    Nothing else should drive the arm while a timeline is playing.
+    """
+
+    def __init__(self, arm, timeline):
+        self.arm = arm
+        self.timeline = timeline
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.thread = None
+
+    def run(self):
+        start_time = time.perf_counter()
+        try:
+            for offset, changes in self.timeline:
+                # Event.wait sleeps until the event is due but wakes at once if we're cancelled
+                if self.cancelled.wait(max(0.0, start_time + offset - time.perf_counter())):
+                    break
+                now = time.perf_counter()
+                self.arm.update_time(now)
+                self.arm.apply_motor_directions(changes)
+            self.arm.update_time(time.perf_counter())
+            self.arm.apply_motor_directions([(motor, 0) for motor in self.arm.motors])
+        finally:
+            self.finished.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='RobotArmTimelinePlayer')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def cancel(self, wait=True):
+        self.cancelled.set()
+        if wait:
+            self.wait()
+
+    def wait(self, timeout=None):
+        "Block until the timeline has finished or been cancelled, returning True if it has"
+        return self.finished.wait(timeout)
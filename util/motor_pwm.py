@@ -0,0 +1,131 @@
+import threading
+import time
+
+MOTOR_NAMES = ('base', 'shoulder', 'elbow', 'wrist', 'grip')
+
+
+class MotorPwm(object):
+    """
+    Proportional speed for the arm's on/off motors by switching them on for a
+    share of every PWM tick.
+
+    set_duty() takes a duty between -1.0 and 1.0 for each joint; positive runs
+    the motor in direction 1, negative in direction 2. A background thread
+    ticks 'frequency' times a second and, per joint, adds the duty to a
+    sigma-delta accumulator: the motor runs for the tick whenever the
+    accumulator passes 1.0. So a duty of 0.25 runs the motor one tick in four
+    and the average speed follows the stick. All five joints' on/off states
+    for a tick go to the arm as one combined command, and ticks where nothing
+    changes send nothing at all.
+
+    Soft limits are respected and the motors are stopped when the PWM stops.
+    Nothing else should move the joints while it is running.
+
+    Example:
+    pwm = MotorPwm(arm, frequency=50).start()
+    pwm.set_duty('elbow', 0.3)
+    ...
+    pwm.stop()
+    """
+
+    def __init__(self, arm, frequency=50.0):
+        if frequency <= 0.0:
+            raise ValueError('PWM frequency must be positive')
+        self.arm = arm
+        self.period = 1.0 / frequency
+        self.duties = dict.fromkeys(MOTOR_NAMES, 0.0)
+        self.accumulators = dict.fromkeys(MOTOR_NAMES, 0.0)
+        self.ticks = 0
+        # ticks that started more than a whole period late
+        self.late_ticks = 0
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def set_duty(self, motor, duty):
+        if motor not in self.duties:
+            raise ValueError('Do not know how to move %s' % motor)
+        duty = min(max(duty, -1.0), 1.0)
+        if duty == 0.0 or (duty > 0.0) != (self.duties[motor] > 0.0):
+            # start afresh rather than spend charge built up going the other way
+            self.accumulators[motor] = 0.0
+        self.duties[motor] = duty
+
+    def tick(self):
+        "Work out every joint's on/off state for the next tick and send them as one command"
+        changes = []
+        for name in MOTOR_NAMES:
+            duty = self.duties[name]
+            direction = 0
+            if duty != 0.0:
+                accumulator = self.accumulators[name] + abs(duty)
+                if accumulator >= 1.0:
+                    accumulator -= 1.0
+                    direction = 1 if duty > 0.0 else 2
+                self.accumulators[name] = accumulator
+
+            motor = self.arm.motors[name]
+            if self.arm.soft_limits and not motor.can_move(direction):
+                direction = 0
+            if direction != motor.direction:
+                changes.append((name, direction))
+
+        self.ticks += 1
+        if changes:
+            with self.arm.command_lock:
+                now = time.perf_counter()
+                self.arm.update_time(now)
+                self.arm.apply_motor_directions(changes)
+
+    def run(self):
+        next_tick = time.perf_counter()
+        try:
+            while True:
+                self.tick()
+                next_tick += self.period
+                delay = next_tick - time.perf_counter()
+                if delay < -self.period:
+                    # fell a whole tick behind; carry on from now instead of bursting to catch up
+                    self.late_ticks += 1
+                    next_tick = time.perf_counter()
+                    delay = 0.0
+                # Event.wait sleeps until the next tick but wakes at once if we're stopped
+                if self.stopped.wait(max(0.0, delay)):
+                    break
+        finally:
+            self.arm.apply_motor_directions([(name, 0) for name in MOTOR_NAMES])
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='RobotArmMotorPwm')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        "Stop ticking and stop the motors"
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        for name in MOTOR_NAMES:
+            self.duties[name] = 0.0
+            self.accumulators[name] = 0.0
+
+
+def duty_from_axis(value, dead_zone=0.2):
+    """
+    Scale a stick or trigger reading so the duty rises from 0.0 at the edge of
+    the dead zone to 1.0 at full travel, keeping its sign.
+
+    >>> duty_from_axis(0.2)
+    0.0
+    >>> duty_from_axis(-1.0)
+    -1.0
+    >>> duty_from_axis(0.1)
+    0.0
+    """
+    if -dead_zone < value < dead_zone:
+        return 0.0
+    duty = (abs(value) - dead_zone) / (1.0 - dead_zone)
+    return min(duty, 1.0) if value > 0.0 else -min(duty, 1.0)
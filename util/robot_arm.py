@@ -6,99 +6,234 @@
 # Some inspiration from Neil Polwart and John Hale - http://python-poly.blogspot.co.uk
 # USB commands reference from http://notbrainsurgery.livejournal.com/38622.html
 # See more details on the project at http://mattdyson.org/projects/robotarm
-import pygame
-import platform
-import os
-
-import usb.core
-import usb.backend
+import math
 import time
+import heapq
+import threading
+from itertools import count
 
-# Product information for the arm
-VENDOR = 0x1267
-PRODUCT = 0x0000
-
-# Timeout for our instructions through pyusb
-TIMEOUT = 1000
+from util.arm_devices import UsbArmDevice, TIMEOUT, DEFAULT_JOINT_SPEEDS, DEFAULT_JOINT_LIMITS
+# the USB ids used to be defined here; still importable from this module for older scripts
+from util.arm_devices import VENDOR, PRODUCT  # noqa: F401
+from util.command_writer import CommandWriter
+from util.motion_history import MotionHistory
+from util.motion_timeline import TimelinePlayer, merge_motor_events
 
 
 class Motor:
+    """
+    One of the arm's motors. With no encoders on the arm, 'position' is a dead
+    reckoning estimate in degrees: speed * time spent moving, with direction 1
+    counting as positive, held between the min_position and max_position soft
+    limits.
+
+    Every change of direction is recorded, reversed, in past_motor_commands so
+    the motor's moves can be rewound later.
+
+    The estimate keeps its own clock, position_time, and is brought up to the
+    moment of every direction change, so time is always credited to the
+    direction the motor actually had.
+    """
 
-    def __init__(self, name):
+    def __init__(self, name, speed=1.0, limits=(float('-inf'), float('inf')), history_capacity=16384):
         self.name = name
         self.direction = 0
         self.time_since_last_change = 0.0
-        self.past_motor_commands = []
-        self.current_rewind_command = (0, 0.0)
-        self.next_rewind_change_time = 0.0
-
-    def change_direction(self, direction):
-        # self.record_command()
+        self.last_change_time = time.perf_counter()
+        self.speed = speed
+        self.min_position, self.max_position = limits
+        self.position = 0.0
+        self.position_time = time.perf_counter()
+        self.past_motor_commands = MotionHistory(history_capacity)
+
+    def change_direction(self, direction, record=True):
+        if direction == self.direction:
+            # the controller repeats itself every frame; only real changes are worth keeping
+            return
+        # whatever it was doing up to now counts in the direction it was doing it
+        self.advance(time.perf_counter())
+        if record:
+            self.record_command()
         self.direction = direction
         self.time_since_last_change = 0.0
+        self.last_change_time = time.perf_counter()
 
+    "Advance the position estimate, returning True if the motor is being driven against a soft limit"
     def update_time(self, time_since_last_update):
         self.time_since_last_change += time_since_last_update
-
+        if self.direction == 1:
+            self.position = min(self.position + self.speed * time_since_last_update, self.max_position)
+            return self.position >= self.max_position
+        elif self.direction == 2:
+            self.position = max(self.position - self.speed * time_since_last_update, self.min_position)
+            return self.position <= self.min_position
+        return False
+
+    "Bring the position estimate up to 'now', from time.perf_counter(); True if it has hit a soft limit"
+    def advance(self, now):
+        elapsed = now - self.position_time
+        if elapsed <= 0.0:
+            # already counted by someone who read the clock later
+            return self.direction != 0 and not self.can_move(self.direction)
+        self.position_time = now
+        return self.update_time(elapsed)
+
+    "False if the motor is already at the soft limit that 'direction' would drive it into"
+    def can_move(self, direction):
+        return not ((direction == 1 and self.position >= self.max_position) or
+                    (direction == 2 and self.position <= self.min_position))
+
+    "Seconds until the motor, running as it is now, reaches the soft limit ahead of it; None if it never will"
+    def time_to_limit(self):
+        self.advance(time.perf_counter())
+        if self.direction == 1:
+            distance = self.max_position - self.position
+        elif self.direction == 2:
+            distance = self.position - self.min_position
+        else:
+            return None
+        if math.isinf(distance) or self.speed <= 0.0:
+            return None
+        return max(distance, 0.0) / self.speed
+
+    "Tell the motor where it really is, e.g. after homing the arm by hand"
+    def set_position(self, position):
+        self.position_time = time.perf_counter()
+        self.position = min(max(position, self.min_position), self.max_position)
+
+    "The direction and time to run the motor for to get from the estimated position to 'target'"
+    def move_to_target(self, target):
+        if not math.isfinite(target):
+            # NaN gets past the clamp below and would start a move with no end
+            raise ValueError('%s can only be moved to a finite position, not %r' % (self.name, target))
+        self.advance(time.perf_counter())
+        target = min(max(target, self.min_position), self.max_position)
+        distance = target - self.position
+        if distance == 0.0 or self.speed <= 0.0:
+            return 0, 0.0
+        return (1 if distance > 0.0 else 2), abs(distance) / self.speed
+
+    "Save the move that's just finished, reversed, timed by the clock rather than update_time"
     def record_command(self):
-        if self.direction is 1:
-            self.past_motor_commands.append((2, self.time_since_last_change))
-        elif self.direction is 2:
-            self.past_motor_commands.append((1, self.time_since_last_change))
+        duration = time.perf_counter() - self.last_change_time
+        if self.direction == 1:
+            self.past_motor_commands.append((2, duration))
+        elif self.direction == 2:
+            self.past_motor_commands.append((1, duration))
         else:
-            self.past_motor_commands.append((0, self.time_since_last_change))
+            self.past_motor_commands.append((0, duration))
 
-    def rewind_command(self, elapsed_time):
-        changed_command = False
-        if elapsed_time > self.next_rewind_change_time:
-            if self.past_motor_commands:
-                new_command = self.past_motor_commands.pop()
-                self.next_rewind_change_time += new_command[1]
-                self.direction = new_command[0]
-                changed_command = True
-        return changed_command
+    "Record what the motor has been doing up to this moment, without changing direction"
+    def record_until_now(self):
+        self.record_command()
+        self.last_change_time = time.perf_counter()
+        self.time_since_last_change = 0.0
+
+    "Empty the history into (offset, motor name, direction) events that undo it, newest first"
+    def rewind_events(self, motor_name):
+        events = []
+        offset = 0.0
+        while self.past_motor_commands:
+            direction, duration = self.past_motor_commands.pop()
+            if events and events[-1][0] == offset:
+                # the previous command took no time at all, so this one replaces it
+                events.pop()
+            if not events or events[-1][2] != direction:
+                events.append((offset, motor_name, direction))
+            offset += duration
+        if not events or events[-1][2] != 0:
+            events.append((offset, motor_name, 0))
+        return events
 
 
 class RobotArm:
-    """On initialize, attempt to connect to the robotic arm"""
+    """On initialize, attempt to connect to the robotic arm.
+
+    With batch_commands set, motor and light changes only mark the command set
+    dirty and nothing is sent until flush() is called, typically once per frame.
+
+    With threaded_transport set, transfers happen on a CommandWriter thread so
+    the caller never waits on USB.
+
+    Nothing to do with drawing happens until render_ui is first called, so an
+    arm that is never rendered runs without pygame, a display or the image.
+
+    Commands go to 'device', anything with a send_command(command) method such
+    as a SimulatedArmDevice, or to the USB arm if no device is given.
+
+    joint_speeds and joint_limits override the defaults used to estimate joint
+    positions, keyed by the same names as move_motor. With soft_limits set, a
+    motor whose estimate reaches a limit is stopped straight away and won't be
+    driven any further that way. It's off by default: every estimate starts at
+    0, so only turn it on once joint_limits are calibrated for this arm and
+    each motor has been told where it really is with set_position.
 
-    def __init__(self):
+    history_capacity is how many direction changes each motor remembers for
+    return_to_start_position.
+    """
+
+    def __init__(self, batch_commands=False, threaded_transport=False, ui_image_path='robot_arm.jpg',
+                 device=None, joint_speeds=None, joint_limits=None, soft_limits=False,
+                 history_capacity=16384):
         print("Init'ing RobotArm")
-        current_platform = platform.uname()[0].upper()
-        self.device = None
-        if current_platform == 'WINDOWS':
-            backend_dll_path = "libusb-1.0.dll"
-            if os.path.isfile(backend_dll_path):
-                backend = usb.backend.libusb1.get_backend(find_library=lambda x: backend_dll_path)
-                self.device = usb.core.find(idVendor=VENDOR, idProduct=PRODUCT, backend=backend)
-        else:
-            self.device = usb.core.find(idVendor=VENDOR, idProduct=PRODUCT)
-        if self.device:
+        if device is None:
+            device = UsbArmDevice.find()
+        self.device = device
+        if self.device is not None:
             self.device_connected = True
-            self.device.set_configuration()
         else:
             print("Could not connect to Robotic Arm USB device.")
             self.device_connected = False
 
-        self.rotate = Motor("Base")
-        self.shoulder = Motor("Shoulder")
-        self.elbow = Motor("Elbow")
-        self.wrist = Motor("Wrist")
-        self.grip = Motor("Gripper")
+        self.command_writer = None
+        if self.device_connected and threaded_transport:
+            self.command_writer = CommandWriter(self.device)
+            self.command_writer.start()
+
+        speeds = dict(DEFAULT_JOINT_SPEEDS)
+        speeds.update(joint_speeds or {})
+        limits = dict(DEFAULT_JOINT_LIMITS)
+        limits.update(joint_limits or {})
+        self.rotate = Motor("Base", speeds['base'], limits['base'], history_capacity)
+        self.shoulder = Motor("Shoulder", speeds['shoulder'], limits['shoulder'], history_capacity)
+        self.elbow = Motor("Elbow", speeds['elbow'], limits['elbow'], history_capacity)
+        self.wrist = Motor("Wrist", speeds['wrist'], limits['wrist'], history_capacity)
+        self.grip = Motor("Gripper", speeds['grip'], limits['grip'], history_capacity)
         self.light = 0
 
+        self.soft_limits = soft_limits
+
+        # the motors by the names move_motor knows them as
+        self.motors = {'base': self.rotate, 'shoulder': self.shoulder, 'elbow': self.elbow,
+                       'wrist': self.wrist, 'grip': self.grip}
+
         self.base_motor_direction = 0
         self.shoulder_motor_direction = 0
         self.elbow_motor_direction = 0
         self.wrist_motor_direction = 0
         self.grip_motor_direction = 0
 
-        self.current_time = 0.0
+        self.current_time = time.perf_counter()
 
-        self.robot_arm_image = pygame.image.load('robot_arm.jpg')
-        self.robot_arm_image = self.robot_arm_image.convert()
+        # timed moves waiting to stop, as a heap of (stop time, sequence, motor name)
+        self.motion_schedule = []
+        self.motion_sequence = count()
+        self.scheduled_stops = {}
 
-        self.font = pygame.font.Font(None, 25)
+        self.batch_commands = batch_commands
+        # held while the command set is changed or sent from a thread other than the caller's, e.g. MotorPwm
+        self.command_lock = threading.RLock()
+        self.command_dirty = False
+        self.last_sent_command = None
+        # called as listener(command, time.perf_counter()) for every distinct command sent
+        self.command_listeners = []
+        self.instrumentation = None
+        # when the oldest input not yet answered by a command arrived, while tracing
+        self.traced_input_time = None
+
+        # the UI is only created the first time render_ui is called
+        self.ui_image_path = ui_image_path
+        self.renderer = None
 
         self.reset()
         if self.device_connected:
@@ -107,82 +242,130 @@ class RobotArm:
     "On delete object, stop what we're currently doing"
     def __del__(self):
         print("Stopping RobotArm")
-        self.reset()
+        self.close()
 
-    def update_time(self, new_time, time_since_last_update):
-        self.current_time = new_time
-        self.shoulder.update_time(time_since_last_update)
-        self.elbow.update_time(time_since_last_update)
-        self.wrist.update_time(time_since_last_update)
-        self.grip.update_time(time_since_last_update)
-        self.rotate.update_time(time_since_last_update)
-
-    def render_ui(self, screen):
-        start_x = int((screen.get_width() - self.robot_arm_image.get_width()) / 2)
-        start_y = int((screen.get_height() - self.robot_arm_image.get_height()) / 2)
-        screen.blit(self.robot_arm_image, (start_x, start_y))
-
-        self.render_motor(screen, "Base", self.base_motor_direction, 320, 300)
-        self.render_motor(screen, "Shoulder", self.shoulder_motor_direction, 320, 200)
-        self.render_motor(screen, "Elbow", self.elbow_motor_direction, 350, 130)
-        self.render_motor(screen, "Wrist", self.wrist_motor_direction, 200, 100)
-        self.render_motor(screen, "Grip", self.grip_motor_direction, 50, 190)
-
-    def render_motor(self, screen, name, direction, x, y):
-        text = []
-        if direction == 0:
-            text.append(self.font.render('< ' + name + ' >', True, (0, 0, 0)))
-        if direction == 1:
-            text.append(self.font.render('< ', True, (0, 255, 0)))
-            text.append(self.font.render(name, True, (0, 0, 0)))
-            text.append(self.font.render(' >', True, (0, 0, 0)))
-        if direction == 2:
-            text.append(self.font.render('< ', True, (0, 0, 0)))
-            text.append(self.font.render(name, True, (0, 0, 0)))
-            text.append(self.font.render(' >', True, (0, 255, 0)))
-
-        total_width = 20
-        for i in range(0, len(text)):
-            text_rect = text[i].get_rect()
-            total_width += text_rect.width
-
-        pygame.draw.rect(screen, (255, 255, 255), (x, y, total_width, 40))
-        # noinspection PyArgumentList
-        pygame.draw.rect(screen, (0, 0, 0), (x, y, total_width, 40), 2)
-
-        total_x = x + 10
-        for i in range(0, len(text)):
-            text_rect = text[i].get_rect()
-            text_rect.x = total_x
-            text_rect.y = y + 10
-            screen.blit(text[i], text_rect)
-            total_x += text_rect.width
-
-    def return_to_start_position(self):
-        start_time = time.clock()
-        print('starting return to start position')
-        while self.shoulder.past_motor_commands or self.elbow.past_motor_commands or \
-                self.wrist.past_motor_commands or self.grip.past_motor_commands or self.rotate.past_motor_commands:
-            elapsed_time = time.clock() - start_time
-            changed_command1 = self.shoulder.rewind_command(elapsed_time)
-            changed_command2 = self.elbow.rewind_command(elapsed_time)
-            changed_command3 = self.wrist.rewind_command(elapsed_time)
-            changed_command4 = self.grip.rewind_command(elapsed_time)
-            changed_command5 = self.rotate.rewind_command(elapsed_time)
+    "Time USB transfers into an Instrumentation, or stop timing them if it's None"
+    def set_instrumentation(self, instrumentation):
+        self.instrumentation = instrumentation
+        if self.command_writer is not None:
+            self.command_writer.instrumentation = instrumentation
 
-            changed_command = (changed_command1 or changed_command2 or changed_command3 or
-                               changed_command4 or changed_command5)
-
-            if changed_command:
-                self.update()
+    "Stop all motors and shut down the transport thread, if there is one"
+    def close(self):
+        self.reset()
+        if self.command_writer is not None:
+            self.command_writer.stop(TIMEOUT / 1000.0)
+            self.command_writer = None
+
+    "Advance the arm's clock to new_time, from time.perf_counter() like the timed move deadlines"
+    def update_time(self, new_time, time_since_last_update=None):
+        # each motor counts the time elapsed from its own clock, not the caller's, so the control
+        # loop, MotorPwm and a TimelinePlayer can all advance it without counting the same stretch
+        # twice; time_since_last_update is only still accepted so older callers keep working
+        with self.command_lock:
+            if new_time <= self.current_time:
+                # another thread has already moved the clock past the time this caller read
+                return
+            self.current_time = new_time
+            limit_reached = False
+            for name, motor in self.motors.items():
+                if motor.advance(new_time) and self.soft_limits:
+                    self.move_motor(name, 0)
+                    limit_reached = True
+            self.service_motion(new_time)
+
+            if limit_reached:
+                # don't leave a gearbox grinding until the next frame's flush
+                self.flush()
+
+    "Estimated position of every joint, as of the last update_time"
+    def joint_positions(self):
+        return {name: motor.position for name, motor in self.motors.items()}
+
+    "Draw the arm and its motor labels, returning the rects that changed for pygame.display.update"
+    def render_ui(self, screen, full_redraw=False):
+        if self.renderer is None:
+            # imported here so a headless arm never loads pygame or the image
+            from util.robot_arm_ui import RobotArmRenderer
+            self.renderer = RobotArmRenderer(self.ui_image_path)
+        return self.renderer.render_ui(screen, self, full_redraw)
+
+    "Undo every recorded move, all motors at once. Returns the TimelinePlayer, already finished unless background is set"
+    def return_to_start_position(self, background=False):
+        # close off every motor's history at the same moment so the joints rewind in step
+        for motor in self.motors.values():
+            motor.record_until_now()
+        self.apply_motor_directions([(name, 0) for name in self.motors])
+        motor_events = [motor.rewind_events(name) for name, motor in self.motors.items()]
+        # start with the last move; the idle time since it finished would only be replayed as dead time
+        start = min((offset for events in motor_events for offset, name, direction in events if direction != 0),
+                    default=0.0)
+        timeline = merge_motor_events([[(offset - start, name, direction) for offset, name, direction in events
+                                         if offset >= start] for events in motor_events])
+        player = TimelinePlayer(self, timeline)
 
+        print('starting return to start position')
+        if background:
+            return player.start()
+        player.run()
         print('Finished returning to start position')
+        return player
+
+    "Set several motors, or 'light', at once without recording the changes, and send the result"
+    def apply_motor_directions(self, changes):
+        with self.command_lock:
+            for name, direction in changes:
+                if name == 'light':
+                    self.light = direction
+                    continue
+                self.scheduled_stops.pop(name, None)
+                self.motors[name].change_direction(direction, record=False)
+                setattr(self, name + '_motor_direction', direction)
+            self.update()
+            self.flush()
 
-    "Update the device with the latest command set"
+    "Update the device with the latest command set, or just mark it dirty when batching"
     def update(self):
-        cmd = self.build_command()
-        if self.device_connected:
-            self.device.ctrl_transfer(0x40, 6, 0x100, 0, cmd, TIMEOUT)
+        self.command_dirty = True
+        if not self.batch_commands:
+            self.flush()
+
+    "Send the pending command set in one transfer, skipping it if it matches the last one sent"
+    def flush(self, force=False):
+        with self.command_lock:
+            input_time = self.traced_input_time
+            self.traced_input_time = None
+            if not (self.command_dirty or force):
+                return
+            self.command_dirty = False
+            cmd = self.build_command()
+            if cmd == self.last_sent_command and not force:
+                return
+            if self.command_writer is not None:
+                if input_time is not None:
+                    self.command_writer.post(cmd, (input_time, time.perf_counter()))
+                else:
+                    self.command_writer.post(cmd)
+            elif self.device_connected:
+                if self.instrumentation is not None:
+                    start_time = time.perf_counter()
+                    self.device.send_command(cmd)
+                    end_time = time.perf_counter()
+                    self.instrumentation.record_usb_transfer(end_time - start_time)
+                    if input_time is not None:
+                        self.instrumentation.record_input_latency(input_time, start_time, end_time)
+                else:
+                    self.device.send_command(cmd)
+            if self.command_listeners and cmd != self.last_sent_command:
+                now = time.perf_counter()
+                for listener in self.command_listeners:
+                    listener(cmd, now)
+            self.last_sent_command = cmd
+
+    "Note when an input arrived so the latency to the command it causes can be measured; needs instrumentation"
+    def trace_input(self, input_time):
+        if self.instrumentation is not None and self.traced_input_time is None:
+            self.traced_input_time = input_time
 
     "Build a command set from our current values"
     def build_command(self):
@@ -203,8 +386,12 @@ class RobotArm:
         self.grip.change_direction(0)
         self.rotate.change_direction(0)
         self.light = 0
+        self.scheduled_stops.clear()
+        del self.motion_schedule[:]
 
-        self.update()
+        # sent even if it matches the last command, but only once: update() would send it too when not batching
+        self.command_dirty = True
+        self.flush(force=True)
 
     "Set the light to the opposite of whatever it's on currently"
     def toggle_light(self):
@@ -224,125 +411,138 @@ class RobotArm:
         if direction not in range(0, 3):
             raise ValueError('Base can only be set to stop (0), clockwise (1) or counter-clockwise (2)')
 
+        if self.soft_limits and not self.rotate.can_move(direction):
+            direction = 0
         self.rotate.change_direction(direction)
         self.base_motor_direction = direction
         self.update()
-
-        if time_to_move > 0.0:
-            # sleep for the movement time
-            time.sleep(time_to_move)
-            new_time = time.clock()
-            elapsed_time = new_time - self.current_time
-            self.rotate.update_time(elapsed_time)
-            self.current_time = new_time
-
-            self.rotate.change_direction(0)
-            self.base_motor_direction = 0
-            self.update()
+        self.schedule_stop('base', time_to_move)
 
     "Open or close the grip"
     def move_grip(self, direction, time_to_move=-1.0):
         if direction not in range(0, 3):
             raise ValueError('Grip can only be set to stop (0), close (1) or open (2)')
 
+        if self.soft_limits and not self.grip.can_move(direction):
+            direction = 0
         self.grip.change_direction(direction)
         self.grip_motor_direction = direction
         self.update()
-
-        if time_to_move > 0.0:
-            # sleep for the movement time
-            time.sleep(time_to_move)
-            new_time = time.clock()
-            elapsed_time = new_time - self.current_time
-            self.grip.update_time(elapsed_time)
-            self.current_time = new_time
-
-            self.grip.change_direction(0)
-            self.grip_motor_direction = 0
-            self.update()
+        self.schedule_stop('grip', time_to_move)
 
     "Move the wrist up or down"
     def move_wrist(self, direction, time_to_move=-1.0):
         if direction not in range(0, 3):
             raise ValueError('Wrist can only be set to stop (0), up (1) or down (2)')
 
+        if self.soft_limits and not self.wrist.can_move(direction):
+            direction = 0
         self.wrist.change_direction(direction)
         self.wrist_motor_direction = direction
         self.update()
-
-        if time_to_move > 0.0:
-            # sleep for the movement time
-            time.sleep(time_to_move)
-            new_time = time.clock()
-            elapsed_time = new_time - self.current_time
-            self.wrist.update_time(elapsed_time)
-            self.current_time = new_time
-
-            self.wrist.change_direction(0)
-            self.wrist_motor_direction = 0
-            self.update()
+        self.schedule_stop('wrist', time_to_move)
 
     "Move the elbow up or down"
     def move_elbow(self, direction, time_to_move=-1.0):
         if direction not in range(0, 3):
             raise ValueError('Elbow can only be set to stop (0), up (1) or down (2)')
 
+        if self.soft_limits and not self.elbow.can_move(direction):
+            direction = 0
         self.elbow.change_direction(direction)
         self.elbow_motor_direction = direction
         self.update()
-
-        if time_to_move > 0.0:
-            # sleep for the movement time
-            time.sleep(time_to_move)
-            new_time = time.clock()
-            elapsed_time = new_time - self.current_time
-            self.elbow.update_time(elapsed_time)
-            self.current_time = new_time
-
-            self.elbow.change_direction(0)
-            self.elbow_motor_direction = 0
-            self.update()
+        self.schedule_stop('elbow', time_to_move)
 
     "Move the shoulder up or down"
     def move_shoulder(self, direction, time_to_move=-1.0):
         if direction not in range(0, 3):
             raise ValueError('Shoulder can only be set to stop (0), up (1) or down (2)')
 
+        if self.soft_limits and not self.shoulder.can_move(direction):
+            direction = 0
         self.shoulder.change_direction(direction)
         self.shoulder_motor_direction = direction
         self.update()
-
+        self.schedule_stop('shoulder', time_to_move)
+
+    "Stop the named motor after time_to_move seconds, replacing any stop already scheduled for it"
+    def schedule_stop(self, motor, time_to_move):
+        if self.soft_limits:
+            # stop it at the limit too, so wait_for_motion and anything else waiting on
+            # next_motion_deadline wakes up in time rather than leaving it against the end stop
+            time_to_limit = self.motors[motor].time_to_limit()
+            if time_to_limit is not None and (time_to_move <= 0.0 or time_to_limit < time_to_move):
+                if time_to_limit <= 0.0:
+                    # the estimate was behind and the joint is at the limit already
+                    self.move_motor(motor, 0)
+                    return
+                time_to_move = time_to_limit
         if time_to_move > 0.0:
-            # sleep for the movement time
-            time.sleep(time_to_move)
-            new_time = time.clock()
-            elapsed_time = new_time - self.current_time
-            self.shoulder.update_time(elapsed_time)
-            self.current_time = new_time
-
-            self.shoulder.change_direction(0)
-            self.shoulder_motor_direction = 0
-            self.update()
+            stop = (time.perf_counter() + time_to_move, next(self.motion_sequence), motor)
+            self.scheduled_stops[motor] = stop
+            heapq.heappush(self.motion_schedule, stop)
+        else:
+            self.scheduled_stops.pop(motor, None)
+
+    "Stop every timed move whose deadline is at or before 'now'"
+    def service_motion(self, now):
+        while self.motion_schedule and self.motion_schedule[0][0] <= now:
+            stop = heapq.heappop(self.motion_schedule)
+            if self.scheduled_stops.get(stop[2]) is stop:
+                self.move_motor(stop[2], 0)
+
+    "The time the next timed move is due to stop, or None if nothing is scheduled"
+    def next_motion_deadline(self):
+        while self.motion_schedule:
+            stop = self.motion_schedule[0]
+            if self.scheduled_stops.get(stop[2]) is stop:
+                return stop[0]
+            # superseded by a later move of the same motor
+            heapq.heappop(self.motion_schedule)
+        return None
+
+    "Block until all timed moves, and any move heading for a soft limit, have stopped; for scripts without an update loop"
+    def wait_for_motion(self):
+        # make sure the moves have actually started before waiting on them
+        self.flush()
+        deadline = self.next_motion_deadline()
+        while deadline is not None:
+            delay = deadline - time.perf_counter()
+            if delay > 0.0:
+                time.sleep(delay)
+            now = time.perf_counter()
+            self.update_time(now)
+            self.flush()
+            deadline = self.next_motion_deadline()
 
     "Convenience method for moving motors by name"
-    def move_motor(self, motor, direction):
+    def move_motor(self, motor, direction, time_to_move=-1.0):
         if motor == 'base':
-            self.move_base(direction)
+            self.move_base(direction, time_to_move)
         elif motor == 'shoulder':
-            self.move_shoulder(direction)
+            self.move_shoulder(direction, time_to_move)
         elif motor == 'elbow':
-            self.move_elbow(direction)
+            self.move_elbow(direction, time_to_move)
         elif motor == 'wrist':
-            self.move_wrist(direction)
+            self.move_wrist(direction, time_to_move)
         elif motor == 'grip':
-            self.move_grip(direction)
+            self.move_grip(direction, time_to_move)
         else:
             raise ValueError('Do not know how to move %s' % motor)
 
+    "Run a motor for just long enough to bring its estimated position to 'target'"
+    def move_to(self, motor, target):
+        direction, time_to_move = self.motors[motor].move_to_target(target)
+        if direction != 0:
+            self.move_motor(motor, direction, time_to_move)
+
     "Flash the light 'iterations' times, with a gap of 'interval' between each"
     def flash_light(self, iterations, interval):
         for i in range(iterations):
             self.set_light(1)
+            self.flush()
             time.sleep(interval)
             self.set_light(0)
+            self.flush()
             time.sleep(interval)
@@ -0,0 +1,92 @@
+import pygame
+
+
+class RobotArmRenderer:
+    """Draws the arm image and its motor direction labels for a RobotArm"""
+
+    def __init__(self, image_path='robot_arm.jpg'):
+        self.robot_arm_image = pygame.image.load(image_path)
+        self.robot_arm_image = self.robot_arm_image.convert()
+
+        self.font = pygame.font.Font(None, 25)
+        self.motor_labels = {}
+        self.rendered_motor_labels = {}
+        self.ui_background = None
+
+    "Draw the arm and its motor labels, returning the rects that changed for pygame.display.update"
+    def render_ui(self, screen, arm, full_redraw=False):
+        if full_redraw or self.ui_background is None:
+            start_x = int((screen.get_width() - self.robot_arm_image.get_width()) / 2)
+            start_y = int((screen.get_height() - self.robot_arm_image.get_height()) / 2)
+            screen.blit(self.robot_arm_image, (start_x, start_y))
+            # keep what's under the labels so a shrinking label can be cleaned up later
+            self.ui_background = screen.copy()
+            self.rendered_motor_labels.clear()
+            full_redraw = True
+
+        dirty_rects = [
+            self.render_motor(screen, "Base", arm.base_motor_direction, 320, 300),
+            self.render_motor(screen, "Shoulder", arm.shoulder_motor_direction, 320, 200),
+            self.render_motor(screen, "Elbow", arm.elbow_motor_direction, 350, 130),
+            self.render_motor(screen, "Wrist", arm.wrist_motor_direction, 200, 100),
+            self.render_motor(screen, "Grip", arm.grip_motor_direction, 50, 190)]
+
+        if full_redraw:
+            return [screen.get_rect()]
+        return [rect for rect in dirty_rects if rect is not None]
+
+    "Draw a motor's label if its direction has changed since it was last drawn, returning the dirty rect"
+    def render_motor(self, screen, name, direction, x, y):
+        previous = self.rendered_motor_labels.get(name)
+        if previous is not None and previous[0] == direction:
+            return None
+
+        label = self.get_motor_label(name, direction)
+        label_rect = label.get_rect(topleft=(x, y))
+        dirty_rect = label_rect
+        if previous is not None:
+            screen.blit(self.ui_background, previous[1], previous[1])
+            dirty_rect = label_rect.union(previous[1])
+        screen.blit(label, label_rect)
+
+        self.rendered_motor_labels[name] = (direction, label_rect)
+        return dirty_rect
+
+    "Get the boxed label for a motor and direction, rendering it the first time it's asked for"
+    def get_motor_label(self, name, direction):
+        label = self.motor_labels.get((name, direction))
+        if label is not None:
+            return label
+
+        text = []
+        if direction == 0:
+            text.append(self.font.render('< ' + name + ' >', True, (0, 0, 0)))
+        if direction == 1:
+            text.append(self.font.render('< ', True, (0, 255, 0)))
+            text.append(self.font.render(name, True, (0, 0, 0)))
+            text.append(self.font.render(' >', True, (0, 0, 0)))
+        if direction == 2:
+            text.append(self.font.render('< ', True, (0, 0, 0)))
+            text.append(self.font.render(name, True, (0, 0, 0)))
+            text.append(self.font.render(' >', True, (0, 255, 0)))
+
+        total_width = 20
+        for i in range(0, len(text)):
+            text_rect = text[i].get_rect()
+            total_width += text_rect.width
+
+        label = pygame.Surface((total_width, 40)).convert()
+        pygame.draw.rect(label, (255, 255, 255), (0, 0, total_width, 40))
+        # noinspection PyArgumentList
+        pygame.draw.rect(label, (0, 0, 0), (0, 0, total_width, 40), 2)
+
+        total_x = 10
+        for i in range(0, len(text)):
+            text_rect = text[i].get_rect()
+            text_rect.x = total_x
+            text_rect.y = 10
+            label.blit(text[i], text_rect)
+            total_x += text_rect.width
+
+        self.motor_labels[(name, direction)] = label
+        return label
@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+from util.arm_devices import encode_command
+from util.motion_timeline import TimelinePlayer, merge_motor_events
+
+MOTOR_NAMES = ('base', 'shoulder', 'elbow', 'wrist', 'grip')
+
+# Run 'motor' in 'direction' (1 or 2) from 'start' seconds into the trajectory for 'duration' seconds
+JointMove = namedtuple('JointMove', 'motor direction start duration')
+
+
+class Trajectory(object):
+    """
+    A script of joint moves compiled into the fewest combined commands.
+
+    Moves of different joints that overlap share commands, back to back moves
+    of the same joint don't stop it in between, and changes closer together
+    than merge_window seconds go out as one command. Two moves of the same
+    joint may not overlap.
+
+    Example:
+    trajectory = Trajectory([('elbow', 1, 0.0, 1.5), ('wrist', 2, 0.5, 0.5), ('grip', 1, 1.5, 0.8)])
+    print(trajectory.cycle_time, len(trajectory.commands))
+    trajectory.run(arm)
+    """
+
+    def __init__(self, moves, merge_window=0.001):
+        self.moves = sorted((JointMove(*move) for move in moves), key=lambda move: (move.motor, move.start))
+        for move in self.moves:
+            if move.motor not in MOTOR_NAMES:
+                raise ValueError('Do not know how to move %s' % move.motor)
+            if move.direction not in (1, 2):
+                raise ValueError('%s move direction can only be 1 or 2' % move.motor)
+            if move.start < 0.0 or move.duration <= 0.0:
+                raise ValueError('%s move needs a start of zero or more and a positive duration' % move.motor)
+
+        self.merge_window = merge_window
+        self.timeline = merge_motor_events([self.motor_events(motor) for motor in MOTOR_NAMES], merge_window)
+        self.cycle_time = max([move.start + move.duration for move in self.moves] or [0.0])
+
+        # the distinct (offset, command bytes) states the arm will go through
+        self.commands = []
+        directions = dict.fromkeys(MOTOR_NAMES, 0)
+        for offset, changes in self.timeline:
+            directions.update(changes)
+            command = encode_command(directions)
+            if not self.commands or self.commands[-1][1] != command:
+                self.commands.append((offset, command))
+
+    def motor_events(self, motor):
+        events = []
+        start = end = 0.0
+        for move in self.moves:
+            if move.motor != motor:
+                continue
+            if events and move.start < end:
+                raise ValueError('%s moves at %gs and %gs overlap' % (motor, start, move.start))
+
+            if events and move.start - end < self.merge_window:
+                # carries straight on from the last move, so drop the stop in between
+                events.pop()
+            if not events or events[-1][2] != move.direction:
+                events.append((move.start, motor, move.direction))
+            start, end = move.start, move.start + move.duration
+            events.append((end, motor, 0))
+        return events
+
+    def run(self, arm, background=False):
+        "Play the trajectory on 'arm'. Returns the TimelinePlayer, already finished unless background is set"
+        player = TimelinePlayer(arm, self.timeline)
+        if background:
+            return player.start()
+        player.run()
+        return player
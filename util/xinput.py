@@ -19,11 +19,12 @@ https://github.com/r4dian/Xbox-360-Controller-for-Python
 http://support.xbox.com/en-US/xbox-360/accessories/controllers
 """
 
+import collections
 import ctypes
 import sys
+import threading
 import time
-from operator import itemgetter, attrgetter
-from itertools import count, starmap
+from operator import attrgetter
 import pygame
 from pygame.locals import JOYAXISMOTION, JOYBALLMOTION, JOYHATMOTION, JOYBUTTONUP, JOYBUTTONDOWN
 
@@ -122,6 +123,9 @@ def gen_bit_values(number):
 ERROR_DEVICE_NOT_CONNECTED = 1167
 ERROR_SUCCESS = 0
 
+# polls per second for XInputPoller, in the 200-2000Hz range determine_optimal_sample_rate suggests
+DEFAULT_POLL_FREQUENCY = 500.0
+
 
 class PygameEventDispatcher(object):
 
@@ -181,7 +185,8 @@ class PygameEventDispatcher(object):
                 self.hat_x = value * self.hat_map[state]
             # I think we need to assume hat=0
             pygame.event.post(pygame.event.Event(
-                etype, joy=self.joystick.device_number, hat=0, value=(self.hat_x, self.hat_y)))
+                etype, joy=self.joystick.device_number, instance_id=self.joystick.instance_id,
+                hat=0, value=(self.hat_x, self.hat_y)))
         else:
             # It's a regular button in pygame.
             if value == 0:
@@ -190,7 +195,8 @@ class PygameEventDispatcher(object):
                 etype = JOYBUTTONDOWN
             try:
                 button = self.button_map[state]
-                pygame.event.post(pygame.event.Event(etype, joy=self.joystick.device_number, button=button))
+                pygame.event.post(pygame.event.Event(etype, joy=self.joystick.device_number,
+                                                     instance_id=self.joystick.instance_id, button=button))
             except KeyError:
                 print('on_button: unexpected button: state {}, value {}'.format(state, value))
 
@@ -208,6 +214,7 @@ class PygameEventDispatcher(object):
             pygame.event.post(pygame.event.Event(
                 JOYAXISMOTION,
                 joy=self.joystick.device_number,
+                instance_id=self.joystick.instance_id,
                 axis=axis,
                 value=value))
         except KeyError:
@@ -230,19 +237,41 @@ class XInputJoystick(object):  #event.EventDispatcher):  I had to make my own st
 
     Example:
     controller_one = XInputJoystick(0)
+
+    While a poller is running, the poll rate adapts to the controller: every
+    adapt_interval seconds the rate goes up by half if fewer than
+    target_reliability of the packets were caught, and drifts down by a tenth
+    if none were missed, within min_poll_frequency and max_poll_frequency.
+    poll_frequency is the current rate.
     """
     max_devices = 4
 
-    def __init__(self, device_number, normalize_axes=True, event_dispatcher_class=PygameEventDispatcher):
+    # (field name, size in bytes) of every analog field of XINPUT_GAMEPAD, worked out once
+    axis_fields = tuple((name, ctypes.sizeof(field_type)) for name, field_type in XINPUT_GAMEPAD._fields_
+                        if name != 'buttons')
+
+    def __init__(self, device_number, normalize_axes=True, event_dispatcher_class=PygameEventDispatcher,
+                 adaptive_polling=True, target_reliability=0.99, min_poll_frequency=125.0,
+                 max_poll_frequency=2000.0, adapt_interval=0.5):
         values = vars()
         del values['self']
         self.__dict__.update(values)
 
         super(XInputJoystick, self).__init__()
 
+        # the id posted events carry; kept apart from SDL's instance ids, which also count from 0
+        self.instance_id = ('xinput', device_number)
+
         self.event = event_dispatcher_class(self)
 
         self._last_state = self.get_state()
+        # two state buffers that polls alternate between, so polling doesn't allocate
+        self._state_buffers = (XINPUT_STATE(), XINPUT_STATE())
+        self._state_buffer_refs = tuple(map(ctypes.byref, self._state_buffers))
+        self._spare_buffer = 0
+        # the background XInputPoller, while start_polling is in effect, and the rate it polls at
+        self.poller = None
+        self.poll_frequency = DEFAULT_POLL_FREQUENCY
         self.received_packets = 0
         self.missed_packets = 0
 
@@ -292,10 +321,57 @@ class XInputJoystick(object):  #event.EventDispatcher):  I had to make my own st
             int(left_motor * 65535), int(right_motor * 65535))
         XInputSetState(self.device_number, ctypes.byref(vibration))
 
+    def start_polling(self, frequency=None):
+        "Sample the controller on a background thread; dispatch_events then hands on what it queued"
+        if frequency is not None:
+            self.poll_frequency = frequency
+        if self.poller is None:
+            self.poller = XInputPoller(self)
+            self.poller.start()
+        return self.poller
+
+    def adjust_poll_frequency(self, received, missed):
+        "Adapt poll_frequency to the packets received and missed over the last adapt_interval; returns the new rate"
+        if not self.adaptive_polling or received == 0:
+            # nothing happened, so there's nothing to learn from
+            return self.poll_frequency
+        reliability = received / float(received + missed)
+        if reliability < self.target_reliability:
+            self.poll_frequency = min(self.poll_frequency * 1.5, self.max_poll_frequency)
+        elif missed == 0:
+            self.poll_frequency = max(self.poll_frequency * 0.9, self.min_poll_frequency)
+        return self.poll_frequency
+
+    def poll_stats(self):
+        "The current poll rate and packet counts, for instrumentation"
+        total = self.received_packets + self.missed_packets
+        return {'poll_frequency': self.poll_frequency,
+                'received_packets': self.received_packets,
+                'missed_packets': self.missed_packets,
+                'reliability': self.received_packets / float(total) if total else 1.0}
+
+    def stop_polling(self):
+        if self.poller is not None:
+            self.poller.stop()
+            self.poller = None
+
     def dispatch_events(self):
-        "The main event loop for a joystick"
-        state = self.get_state()
-        if not state:
+        """
+        The main event loop for a joystick.
+
+        The state handed to the event handlers is reused two polls later, so
+        handlers that keep it should keep a copy.
+        """
+        if self.poller is not None:
+            self.dispatch_queued_events()
+            return
+        spare = self._spare_buffer
+        state = self._state_buffers[spare]
+        res = xinput.XInputGetState(self.device_number, self._state_buffer_refs[spare])
+        if res != ERROR_SUCCESS:
+            if res != ERROR_DEVICE_NOT_CONNECTED:
+                raise RuntimeError(
+                    "Unknown error %d attempting to get state of device %d" % (res, self.device_number))
             raise RuntimeError(
                 "Joystick %d is not connected" % self.device_number)
         if state.packet_number != self._last_state.packet_number:
@@ -303,6 +379,25 @@ class XInputJoystick(object):  #event.EventDispatcher):  I had to make my own st
             self.update_packet_count(state)
             self.handle_changed_state(state)
         self._last_state = state
+        self._spare_buffer = spare ^ 1
+
+    def dispatch_queued_events(self):
+        "Dispatch every state the poller has queued since the last call, oldest first"
+        states = self.poller.states
+        while states:
+            state = states.popleft()
+            if state.packet_number != self._last_state.packet_number:
+                self.update_packet_count(state)
+                self.handle_changed_state(state)
+            self._last_state = state
+        if self.poller.error is not None:
+            error = self.poller.error
+            self.stop_polling()
+            if error != ERROR_DEVICE_NOT_CONNECTED:
+                raise RuntimeError(
+                    "Unknown error %d attempting to get state of device %d" % (error, self.device_number))
+            raise RuntimeError(
+                "Joystick %d is not connected" % self.device_number)
 
     def update_packet_count(self, state):
         "Keep track of received and missed packets for performance tuning"
@@ -324,15 +419,11 @@ class XInputJoystick(object):  #event.EventDispatcher):  I had to make my own st
         getattr(self.event, name)(state, value=value)
 
     def dispatch_axis_events(self, state):
-        # axis fields are everything but the buttons
-        axis_fields = dict(XINPUT_GAMEPAD._fields_)
-        axis_fields.pop('buttons')
-        for axis, type in list(axis_fields.items()):
-            old_val = getattr(self._last_state.gamepad, axis)
-            new_val = getattr(state.gamepad, axis)
-            data_size = ctypes.sizeof(type)
-            old_val = self.translate(old_val, data_size)
-            new_val = self.translate(new_val, data_size)
+        gamepad = state.gamepad
+        last_gamepad = self._last_state.gamepad
+        for axis, data_size in self.axis_fields:
+            old_val = getattr(last_gamepad, axis)
+            new_val = getattr(gamepad, axis)
 
             # an attempt to add deadzones and dampen noise
             # done by feel rather than following http://msdn.microsoft.com/en-gb/library/windows/desktop/ee417001%28v=vs.85%29.aspx#dead_zone
@@ -340,19 +431,19 @@ class XInputJoystick(object):  #event.EventDispatcher):  I had to make my own st
             # if ((old_val != new_val and (new_val > 0.08000000000000000 or new_val < -0.08000000000000000) and abs(old_val - new_val) > 0.00000000500000000) or
             #    (axis == 'right_trigger' or axis == 'left_trigger') and new_val == 0 and abs(old_val - new_val) > 0.00000000500000000):
             #     self.dispatch_event('on_axis', axis, new_val)
+
+            # translate is the same scaling for old and new, so the raw values can be compared
             if old_val != new_val:
-                self.dispatch_event('on_axis', axis, new_val)
+                self.dispatch_event('on_axis', axis, self.translate(new_val, data_size))
 
     def dispatch_button_events(self, state):
-        changed = state.gamepad.buttons ^ self._last_state.gamepad.buttons
-        changed = get_bit_values(changed, 16)
-        buttons_state = get_bit_values(state.gamepad.buttons, 16)
-        changed.reverse()
-        buttons_state.reverse()
-        button_numbers = count(1)
-        changed_buttons = list(
-            filter(itemgetter(0), list(zip(changed, button_numbers, buttons_state))))
-        tuple(starmap(self.dispatch_button_event, changed_buttons))
+        buttons = state.gamepad.buttons
+        changed = buttons ^ self._last_state.gamepad.buttons
+        # visit only the changed bits, lowest first; bit 0 is button number 1
+        while changed:
+            low_bit = changed & -changed
+            changed ^= low_bit
+            self.dispatch_button_event(1, low_bit.bit_length(), 1 if buttons & low_bit else 0)
 
     def dispatch_button_event(self, changed, number, pressed):
         self.dispatch_event('on_button', number, pressed)
@@ -370,6 +461,78 @@ class XInputJoystick(object):  #event.EventDispatcher):  I had to make my own st
     def on_missed_packet(self, number):
         pass
 
+class XInputPoller(threading.Thread):
+    """
+    Samples one XInputJoystick poll_frequency times a second on its own
+    thread, so how often the controller is read no longer depends on how fast
+    the app draws frames. Every adapt_interval it tells the joystick how many
+    packets it caught and missed, so the rate can adapt.
+
+    Only states whose packet number changed are kept, each as a copy appended
+    to the 'states' deque for the joystick's dispatch_events to drain on the
+    main thread. deque appends and pops are atomic, so no lock is taken on
+    either side. If the main thread stops draining, the oldest states are
+    dropped once max_queued are waiting and counted in dropped_states.
+
+    The thread stops itself if the controller is unplugged, leaving the
+    XInput error code in 'error'.
+    """
+
+    def __init__(self, joystick, max_queued=4096):
+        super(XInputPoller, self).__init__(name='XInputPoller%d' % joystick.device_number)
+        self.daemon = True
+        self.joystick = joystick
+        self.states = collections.deque(maxlen=max_queued)
+        self.stopped = threading.Event()
+        self.error = None
+        self.polls = 0
+        self.dropped_states = 0
+
+    def run(self):
+        state = XINPUT_STATE()
+        state_ref = ctypes.byref(state)
+        joystick = self.joystick
+        last_state = joystick._last_state
+        last_packet = last_state.packet_number if last_state is not None else None
+        received = missed = 0
+        next_poll = next_adapt = time.perf_counter()
+        while True:
+            res = xinput.XInputGetState(joystick.device_number, state_ref)
+            self.polls += 1
+            if res != ERROR_SUCCESS:
+                self.error = res
+                break
+            if state.packet_number != last_packet:
+                if last_packet is not None:
+                    received += 1
+                    missed += max(0, state.packet_number - last_packet - 1)
+                last_packet = state.packet_number
+                if len(self.states) == self.states.maxlen:
+                    self.dropped_states += 1
+                self.states.append(XINPUT_STATE.from_buffer_copy(state))
+
+            now = time.perf_counter()
+            if now >= next_adapt:
+                joystick.adjust_poll_frequency(received, missed)
+                received = missed = 0
+                next_adapt = now + joystick.adapt_interval
+
+            period = 1.0 / joystick.poll_frequency
+            next_poll += period
+            delay = next_poll - now
+            if delay < -period:
+                # fell behind; carry on from now rather than polling in a burst to catch up
+                next_poll = time.perf_counter()
+            # Event.wait sleeps until the next poll but wakes at once if we're stopped
+            if self.stopped.wait(max(0.0, delay)):
+                break
+
+    def stop(self, timeout=1.0):
+        self.stopped.set()
+        if self is not threading.current_thread():
+            self.join(timeout)
+
+
 # list(map(XInputJoystick.register_event_type, [
 #     'on_state_changed',
 #     'on_axis',